@@ -17,5 +17,8 @@ SCRIPT_DIR=$(dirname "$(readlink -f "$0")")
 ## install requirements
 pip3 install -r "$SCRIPT_DIR/requirements.txt"
 
+## install optional requirements (required by all unit tests)
+pip3 install -r "$SCRIPT_DIR/requirements-dense.txt"
+
 
 echo -e "\ninstallation done\n"
@@ -33,11 +33,15 @@ additional_scripts: List[str] = []
 requirements_path = os.path.join(SCRIPT_DIR, "requirements.txt")
 install_reqs = read_list(requirements_path)
 
+## optional dependencies, e.g. numpy for dense change matrix ('changematrix.ArrayChangeMatrix')
+dense_requirements_path = os.path.join(SCRIPT_DIR, "requirements-dense.txt")
+extras_reqs = {"dense": read_list(dense_requirements_path)}
+
 ## every time setup info changes then version number should be increased
 
 setup(
     name="uncrustimpact",
-    version="1.0.1",
+    version="1.0.2",
     description="display uncrustify configuration impact on given source files",
     url="https://github.com/anetczuk/uncrustify-impact",
     author="Arkadiusz Netczuk",
@@ -46,4 +50,5 @@ setup(
     package_data=packages_data,
     scripts=additional_scripts,
     install_requires=install_reqs,
+    extras_require=extras_reqs,
 )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+try:
+    ## following import success only when file is directly executed from command line
+    ## otherwise will throw exception when executing as parameter for "python -m"
+    # pylint: disable=W0611
+    import __init__
+except ImportError:
+    ## when import fails then it means that the script was executed indirectly
+    ## in this case __init__ is already loaded
+    pass
+
+
+import os
+import logging
+import random
+import time
+
+from uncrustimpact.diffengine import DIFF_ENGINES, get_diff_engine
+from uncrustimpact.filediff import count_diff_changes
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def read_lines(file_path):
+    with open(file_path, encoding="utf-8") as item_file:
+        return item_file.readlines()
+
+
+## generate source-like lines
+def generate_lines(lines_num, rand):
+    ret_list = []
+    for index in range(0, lines_num):
+        indent = "    " * rand.randint(0, 3)
+        ret_list.append(f"{indent}int value_{index} = calculate( {rand.randint(0, 100)} );\n")
+    return ret_list
+
+
+## imitate formatting: change whitespaces in some of lines
+def reformat_lines(lines_list, change_ratio, rand):
+    ret_list = []
+    for line in lines_list:
+        if rand.random() < change_ratio:
+            line = line.replace("( ", "(").replace(" )", ")")
+        ret_list.append(line)
+    return ret_list
+
+
+# ===============================================
+
+
+def benchmark(case_name, base_lines, content_lines, repeats=3):
+    print(f"========= {case_name}: {len(base_lines)} lines =========")
+    for engine_name in DIFF_ENGINES:
+        engine = get_diff_engine(engine_name)
+        start_time = time.perf_counter()
+        for _ in range(0, repeats):
+            diff_list = engine.calculate_unified_diff(base_lines, content_lines)
+        duration = (time.perf_counter() - start_time) / repeats
+        changes = count_diff_changes(diff_list)
+        print(f"{engine_name:>10}: {duration * 1000:10.2f} ms, diff length: {len(diff_list)}, changes: {changes}")
+
+
+def run_benchmark():
+    file_1 = os.path.join(SCRIPT_DIR, "data/example_changed.cpp")
+    file_2 = os.path.join(SCRIPT_DIR, "data/example_changed2.cpp")
+    benchmark("data files", read_lines(file_1), read_lines(file_2), repeats=100)
+
+    rand = random.Random(0)
+    base_lines = generate_lines(20000, rand)
+    content_lines = list(base_lines)
+    for index in rand.sample(range(0, len(content_lines)), 5):
+        content_lines[index] = content_lines[index].replace("( ", "(")
+    benchmark("synthetic, 5 lines changed", base_lines, content_lines)
+    benchmark("synthetic, 1% changed", base_lines, reformat_lines(base_lines, 0.01, rand))
+    benchmark("synthetic, 30% changed", base_lines, reformat_lines(base_lines, 0.3, rand))
+    benchmark("synthetic, all changed", base_lines, reformat_lines(base_lines, 1.0, rand))
+
+    ## lines repeating often (braces, empty lines) are hard case of lines matching
+    base_lines = [rand.choice(["{\n", "}\n", "\n", "    return;\n", "    break;\n"]) for _ in range(0, 5000)]
+    content_lines = [line for line in base_lines if rand.random() > 0.05]
+    benchmark("synthetic, repeated lines", base_lines, content_lines)
+
+
+def main():
+    run_benchmark()
+
+
+## ============================= main section ===================================
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+try:
+    ## following import success only when file is directly executed from command line
+    ## otherwise will throw exception when executing as parameter for "python -m"
+    # pylint: disable=W0611
+    import __init__
+except ImportError:
+    ## when import fails then it means that the script was executed indirectly
+    ## in this case __init__ is already loaded
+    pass
+
+
+import os
+import logging
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Any
+
+from uncrustimpact.filediff import LineModifiers, LineModifier, UnifiedDiffChanges
+from uncrustimpact.changematrix import create_change_matrix
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## representation of states used before packing states to integers
+@dataclass
+class DictLineState:
+    label_name: str
+    state: LineModifier
+
+
+## states of line stored in plain lists of objects
+@dataclass
+class DictLineModifiers:
+    modifiers: List[DictLineState] = field(default_factory=list)
+    parse_ids: List[Any] = field(default_factory=list)
+    not_same_ids: List[int] = field(default_factory=list)
+
+    def add_state(self, label, modifier: LineModifier, parse_id=None):
+        self.modifiers.append(DictLineState(label, modifier))
+        self.parse_ids.append(parse_id)
+
+
+MODIFIERS = [LineModifier.CHANGED, LineModifier.ADDED, LineModifier.REMOVED]
+
+
+# ===============================================
+
+
+## 'create_item' is callable creating empty modifiers of line
+def measure_storage(case_name, create_item, lines_num, states_num, labels_list):
+    rand = random.Random(0)
+    tracemalloc.start()
+    lines_list = []
+    for _ in range(0, lines_num):
+        item = create_item()
+        for _ in range(0, states_num):
+            label_index = rand.randrange(0, len(labels_list))
+            item.add_state(labels_list[label_index], rand.choice(MODIFIERS), label_index)
+        lines_list.append(item)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    states_total = lines_num * states_num
+    print(f"{case_name:>20}: {allocated / states_total:8.2f} bytes per state ({states_total} states)")
+
+
+def measure_changes(lines_num, variants_num):
+    rand = random.Random(0)
+    base_lines = [f"line {index}\n" for index in range(0, lines_num)]
+    variants_list = []
+    for _ in range(0, variants_num):
+        content_lines = list(base_lines)
+        for _ in range(0, lines_num // 20):
+            content_lines[rand.randrange(0, lines_num)] = "changed\n"
+        variants_list.append(content_lines)
+
+    tracemalloc.start()
+    changes = UnifiedDiffChanges("base", base_lines)
+    for variant_index, content_lines in enumerate(variants_list):
+        changes.add_diff(f"param_{variant_index}", content_lines)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    file_state = changes.file_state
+    states_total = sum(len(item.states) for item in file_state.line_state.values())
+    print(f"{'UnifiedDiffChanges':>20}: {allocated / states_total:8.2f} bytes per state ({states_total} states)")
+
+
+def run_benchmark():
+    labels_list = [f"param_{index}" for index in range(0, 600)]
+    print("========= line modifiers storage =========")
+    measure_storage("dataclass states", DictLineModifiers, 20000, 5, labels_list)
+    ## labels are interned in advance, so only states are measured
+    matrix = create_change_matrix(20000)
+    for label in labels_list:
+        matrix.get_label_id(label)
+    measure_storage("packed states", lambda: LineModifiers(matrix), 20000, 5, labels_list)
+    print("========= parsing diffs (with change matrix) =========")
+    measure_changes(5000, 200)
+
+
+def main():
+    run_benchmark()
+
+
+## ============================= main section ===================================
+
+
+if __name__ == "__main__":
+    main()
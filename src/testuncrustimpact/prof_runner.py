@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+try:
+    ## following import success only when file is directly executed from command line
+    ## otherwise will throw exception when executing as parameter for "python -m"
+    # pylint: disable=W0611
+    import __init__
+except ImportError:
+    ## when import fails then it means that the script was executed indirectly
+    ## in this case __init__ is already loaded
+    pass
+
+
+import os
+import time
+import tempfile
+import argparse
+
+from uncrustimpact.runner import execute_uncrustify, execute_uncrustify_pipe, read_lines, split_lines
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ===============================================
+
+
+## executes uncrustify through shell and reads output file back (as done before)
+def run_system(input_file, config_file, repeats):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_file = os.path.join(tmp_dir, "output.txt")
+        for _ in range(0, repeats):
+            execute_uncrustify(input_file, config_file, out_file)
+            read_lines(out_file)
+
+
+## executes uncrustify directly passing data through pipes
+def run_pipe(input_file, config_file, repeats):
+    for _ in range(0, repeats):
+        output_data = execute_uncrustify_pipe(input_file, config_file)
+        split_lines(output_data)
+
+
+def measure(label, run_function, input_file, config_file, repeats):
+    start_time = time.perf_counter()
+    run_function(input_file, config_file, repeats)
+    duration = time.perf_counter() - start_time
+    print(f"{label}: {repeats} spawns in {duration:.3f}s, {repeats / duration:.2f} spawns per second")
+
+
+def main():
+    default_file = os.path.join(SCRIPT_DIR, "data", "example_changed.cpp")
+    default_config = os.path.join(SCRIPT_DIR, "..", "..", "examples", "uncrustify_impact", "config.cfg")
+
+    parser = argparse.ArgumentParser(description="compare spawn rate of uncrustify runners")
+    parser.add_argument("--file", action="store", default=default_file, help="File to format")
+    parser.add_argument("--config", action="store", default=default_config, help="Uncrustify config")
+    parser.add_argument("--repeat", action="store", type=int, default=200, help="Number of executions")
+    args = parser.parse_args()
+
+    measure("os.system", run_system, args.file, args.config, args.repeat)
+    measure("pipe", run_pipe, args.file, args.config, args.repeat)
+
+
+## ============================= main section ===================================
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,13 @@
 # LICENSE file in the root directory of this source tree.
 #
 
+import os
 import unittest
+import tempfile
+import pickle  # nosec
 
-from uncrustimpact.cfgparser import read_doc_set, CfgLine
+from uncrustimpact.cfgparser import read_doc_set, CfgLine, ParamType, parse_params_space, load_default_config_data
+from uncrustimpact.cfgparser import write_overlay_cfg
 
 
 class CfgParserTest(unittest.TestCase):
@@ -124,3 +128,43 @@ class CfgLineTest(unittest.TestCase):
     def test_is_valid_comment(self):
         cfg_line = CfgLine("# qwe")
         self.assertEqual(False, cfg_line.is_valid())
+
+
+class CfgFilesTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.entry_path = os.path.join(self.temp_dir.name, "entry.pickle")
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.temp_dir.cleanup()
+
+    def test_parse_params_space(self):
+        config_lines = ["# Number of columns to indent per level.\n", "indent_columns = 8 # unsigned number\n"]
+        params_space = parse_params_space(config_lines)
+        self.assertEqual(["indent_columns"], list(params_space.keys()))
+        self.assertEqual(8, params_space["indent_columns"]["value"])
+        self.assertEqual(ParamType.UNSIGNED, params_space["indent_columns"]["type"])
+
+    def test_load_entry(self):
+        self.assertEqual(None, load_default_config_data(self.entry_path, "bin:1:2"))
+        entry_data = {"binary_id": "bin:1:2", "config_lines": [], "params_space": {}}
+        with open(self.entry_path, "wb") as entry_file:
+            pickle.dump(entry_data, entry_file)
+        self.assertEqual(entry_data, load_default_config_data(self.entry_path, "bin:1:2"))
+        ## binary changed
+        self.assertEqual(None, load_default_config_data(self.entry_path, "bin:3:2"))
+
+    def test_load_entry_invalid(self):
+        with open(self.entry_path, "wb") as entry_file:
+            entry_file.write(b"invalid")
+        self.assertEqual(None, load_default_config_data(self.entry_path, "bin:1:2"))
+
+    def test_write_overlay_cfg(self):
+        base_path = os.path.join(self.temp_dir.name, "base.cfg")
+        out_path = os.path.join(self.temp_dir.name, "variant.cfg")
+        write_overlay_cfg(base_path, {"indent_columns": 2}, out_path)
+        with open(out_path, encoding="utf-8") as out_file:
+            content = out_file.read()
+        self.assertEqual(f"""include "{base_path}"\nindent_columns = 2\n""", content)
@@ -0,0 +1,75 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import unittest
+
+from uncrustimpact import changematrix
+from uncrustimpact.changematrix import BitsetChangeMatrix, STATE_CHANGED, STATE_ADDED, STATE_REMOVED
+
+
+class BitsetChangeMatrixTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def create_matrix(self, length):
+        return BitsetChangeMatrix(length)
+
+    def test_empty(self):
+        matrix = self.create_matrix(3)
+        self.assertEqual(0, matrix.count_changes())
+        self.assertEqual(0, matrix.count_changes("aaa"))
+        self.assertEqual(0, matrix.count_changed_lines())
+        self.assertEqual(0, matrix.get_line_state(1))
+        self.assertEqual([], matrix.get_line_labels(1, STATE_CHANGED))
+
+    def test_count(self):
+        matrix = self.create_matrix(3)
+        matrix.add_state(-1, "aaa", STATE_ADDED)
+        matrix.add_state(0, "aaa", STATE_CHANGED)
+        matrix.add_state(0, "aaa", STATE_ADDED)
+        matrix.add_state(0, "bbb", STATE_CHANGED)
+        matrix.add_state(2, "bbb", STATE_REMOVED)
+        matrix.add_state(2, "bbb", STATE_REMOVED)
+
+        self.assertEqual(3, matrix.count_changes("aaa"))
+        self.assertEqual(2, matrix.count_changes("bbb"))
+        self.assertEqual(0, matrix.count_changes("ccc"))
+        self.assertEqual(4, matrix.count_changes())
+        self.assertEqual(3, matrix.count_changed_lines())
+
+    def test_line_labels(self):
+        matrix = self.create_matrix(3)
+        matrix.add_state(1, "bbb", STATE_REMOVED)
+        matrix.add_state(1, "aaa", STATE_CHANGED)
+        matrix.add_state(1, "ccc", STATE_ADDED)
+
+        self.assertEqual(STATE_CHANGED | STATE_ADDED | STATE_REMOVED, matrix.get_line_state(1))
+        self.assertEqual(["aaa"], matrix.get_line_labels(1, STATE_CHANGED))
+        self.assertEqual(["bbb", "aaa"], matrix.get_line_labels(1, STATE_CHANGED | STATE_REMOVED))
+        self.assertEqual(["ccc"], matrix.get_line_labels(1, STATE_ADDED))
+        self.assertEqual([], matrix.get_line_labels(0, STATE_ADDED))
+
+    def test_many_labels(self):
+        matrix = self.create_matrix(2)
+        for index in range(0, 100):
+            matrix.add_state(index % 2, f"label_{index}", STATE_CHANGED)
+
+        self.assertEqual(1, matrix.count_changes("label_99"))
+        self.assertEqual(2, matrix.count_changes())
+        self.assertEqual(50, len(matrix.get_line_labels(1, STATE_CHANGED)))
+
+
+@unittest.skipIf(changematrix.numpy is None, "numpy not available")
+class ArrayChangeMatrixTest(BitsetChangeMatrixTest):
+    def create_matrix(self, length):
+        return changematrix.ArrayChangeMatrix(length)
@@ -0,0 +1,174 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import unittest
+import random
+
+from uncrustimpact.diffengine import DIFF_ENGINES, InternedLines, get_diff_engine, intern_lines
+from uncrustimpact.diffengine import calculate_myers_matches, calculate_windowed_blocks
+from uncrustimpact.filediff import UnifiedDiffChanges, count_diff_changes
+
+
+class MyersDiffEngineTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.engine = get_diff_engine("myers")
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_same(self):
+        diff_list = self.engine.calculate_unified_diff(["aaa\n", "bbb\n"], ["aaa\n", "bbb\n"])
+        self.assertEqual([], diff_list)
+
+    def test_diff(self):
+        base_lines = ["aaa\n", "bbb\n", "ccc\n", "ddd\n"]
+        content_lines = ["xxx\n", "aaa\n", "ccc\n", "eee\n"]
+        diff_list = self.engine.calculate_unified_diff(base_lines, content_lines)
+        self.assertEqual(
+            [
+                "--- ",
+                "+++ ",
+                "@@ -0,0 +1 @@",
+                "+xxx\n",
+                "@@ -2 +2,0 @@",
+                "-bbb\n",
+                "@@ -4 +4 @@",
+                "-ddd\n",
+                "+eee\n",
+            ],
+            diff_list,
+        )
+
+    def test_diff_difflib(self):
+        ## the same diff as calculated by difflib
+        base_lines = ["aaa\n", "bbb\n", "ccc\n", "ddd\n"]
+        content_lines = ["aaa\n", "BBB\n", "ccc\n", "ddd\n", "eee\n"]
+        diff_list = self.engine.calculate_unified_diff(base_lines, content_lines)
+        difflib_list = get_diff_engine("difflib").calculate_unified_diff(base_lines, content_lines)
+        self.assertEqual(difflib_list, diff_list)
+
+    def test_matches_minimal(self):
+        rand = random.Random(1)
+        for _ in range(0, 200):
+            base_ids = [rand.randint(0, 4) for _ in range(0, rand.randint(0, 20))]
+            content_ids = [rand.randint(0, 4) for _ in range(0, rand.randint(0, 20))]
+            matches = calculate_myers_matches(base_ids, content_ids)
+            self.assertEqual(calculate_lcs_length(base_ids, content_ids), len(matches))
+            for base_index, content_index in matches:
+                self.assertEqual(base_ids[base_index], content_ids[content_index])
+
+    def test_intern_lines(self):
+        base_ids, content_ids = intern_lines(["aaa", "bbb", "aaa"], ["bbb", "ccc"])
+        self.assertEqual([0, 1, 0], base_ids)
+        self.assertEqual([1, 2], content_ids)
+
+    def test_intern_lines_base(self):
+        base_lines = InternedLines(["aaa", "bbb", "aaa"])
+        base_ids, content_ids = intern_lines(base_lines, ["bbb", "ccc", "ccc"])
+        self.assertEqual([0, 1, 0], base_ids)
+        self.assertEqual([1, 2, 2], content_ids)
+        ## ids of base are not affected by previous content
+        _, content_ids = intern_lines(base_lines, ["ddd", "aaa"])
+        self.assertEqual([2, 0], content_ids)
+
+    def test_changes(self):
+        base_lines = ["aaa\n", "bbb\n", "ccc\n"]
+        changes = UnifiedDiffChanges("base", base_lines, diff_engine="myers")
+        changes.add_diff("label", ["aaa\n", "ccc\n", "ddd\n"])
+        self.assertEqual(2, changes.count_changes())
+
+
+def calculate_lcs_length(base_list, content_list):
+    prev_row = [0] * (len(content_list) + 1)
+    for base_item in base_list:
+        row = [0]
+        for index, content_item in enumerate(content_list):
+            if base_item == content_item:
+                row.append(prev_row[index] + 1)
+            else:
+                row.append(max(prev_row[index + 1], row[index]))
+        prev_row = row
+    return prev_row[-1]
+
+
+class PatienceDiffEngineTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.engine = get_diff_engine("patience")
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_same(self):
+        diff_list = self.engine.calculate_unified_diff(["aaa\n", "bbb\n"], ["aaa\n", "bbb\n"])
+        self.assertEqual([], diff_list)
+
+    def test_diff(self):
+        base_lines = [f"line {index}\n" for index in range(0, 1000)]
+        content_lines = list(base_lines)
+        content_lines[10] = "changed\n"
+        del content_lines[500]
+        content_lines.insert(900, "added\n")
+        diff_list = self.engine.calculate_unified_diff(base_lines, content_lines)
+        self.assertEqual(
+            [
+                "--- ",
+                "+++ ",
+                "@@ -11 +11 @@",
+                "-line 10\n",
+                "+changed\n",
+                "@@ -501 +500,0 @@",
+                "-line 500\n",
+                "@@ -901,0 +901 @@",
+                "+added\n",
+            ],
+            diff_list,
+        )
+
+    def test_blocks(self):
+        rand = random.Random(1)
+        for _ in range(0, 200):
+            base_list = [rand.randint(0, 20) for _ in range(0, rand.randint(0, 30))]
+            content_list = list(base_list)
+            for _ in range(0, rand.randint(0, 4)):
+                content_list.insert(rand.randint(0, len(content_list)), rand.randint(0, 25))
+            blocks = calculate_windowed_blocks(base_list, content_list)
+            prev_end = (0, 0)
+            for base_start, content_start, block_size in blocks:
+                self.assertGreaterEqual(base_start, prev_end[0])
+                self.assertGreaterEqual(content_start, prev_end[1])
+                self.assertEqual(
+                    base_list[base_start : base_start + block_size],
+                    content_list[content_start : content_start + block_size],
+                )
+                prev_end = (base_start + block_size, content_start + block_size)
+
+
+class DiffEngineBytesTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_bytes(self):
+        base_lines = ["aaa\n", "bbb\n", "ccc\n", "ddd\n"]
+        content_lines = ["xxx\n", "aaa\n", "ccc\n", "café\n"]
+        base_bytes = [line.encode("latin-1") for line in base_lines]
+        content_bytes = [line.encode("latin-1") for line in content_lines]
+        for engine_name in DIFF_ENGINES:
+            engine = get_diff_engine(engine_name)
+            diff_list = engine.calculate_unified_diff(base_lines, content_lines)
+            bytes_list = engine.calculate_unified_diff(base_bytes, content_bytes)
+            self.assertEqual([line.encode("latin-1") for line in diff_list], bytes_list)
+            self.assertEqual(count_diff_changes(diff_list), count_diff_changes(bytes_list))
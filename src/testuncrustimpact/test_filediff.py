@@ -6,10 +6,13 @@
 # LICENSE file in the root directory of this source tree.
 #
 
+import io
 import unittest
 
-from uncrustimpact.filediff import LineModifiers, LineModifier
-from uncrustimpact.filediff import NDiffChanges, UnifiedDiffChanges
+from uncrustimpact.filediff import LineModifiers, LineModifier, LineState
+from uncrustimpact.filediff import NDiffChanges, UnifiedDiffChanges, count_diff_changes
+from uncrustimpact.filediff import print_unified_diff_list, iterate_unified_diff_text
+from uncrustimpact.filediff import write_unified_diff, read_unified_diff
 
 
 class LineModifiersTest(unittest.TestCase):
@@ -31,6 +34,36 @@ class LineModifiersTest(unittest.TestCase):
         changes = modifiers.count_changes("xxx")
         self.assertEqual(2, changes)
 
+    def test_states(self):
+        modifiers = LineModifiers()
+
+        modifiers.add_state("xxx", LineModifier.ADDED, 3)
+        modifiers.add_state(None, LineModifier.REMOVED)
+        modifiers.add_state("yyy", LineModifier.SAME, 1000)
+
+        self.assertEqual([3, None, 1000], modifiers.parse_ids)
+        self.assertEqual([LineState("xxx", LineModifier.ADDED)], modifiers.modifiers[:1])
+        self.assertEqual([None], modifiers.get_modified_files())
+        self.assertEqual(["xxx"], modifiers.get_modifier_files(LineModifier.ADDED))
+        self.assertEqual([("xxx", "ADDED"), (None, "REMOVED"), ("yyy", "SAME")], modifiers.to_list_raw())
+        self.assertEqual(0, modifiers.count_changes("yyy"))
+        self.assertEqual(0, modifiers.count_changes("zzz"))
+        self.assertTrue(modifiers.has_same())
+
+    def test_labels_of_file(self):
+        changes = UnifiedDiffChanges("base.txt", ["aaa\n", "bbb\n"])
+        changes.add_diff("xxx", ["aaa\n", "ccc\n"])
+        other_changes = UnifiedDiffChanges("base.txt", ["aaa\n", "bbb\n"])
+        other_changes.add_diff("yyy", ["ccc\n", "bbb\n"])
+
+        ## labels are interned separately for each file
+        self.assertEqual(["xxx"], changes.file_state.matrix.labels)
+        self.assertEqual(["yyy"], other_changes.file_state.matrix.labels)
+        self.assertEqual(["xxx"], changes.file_state.get_line_modifiers(1).get_modifier_files(LineModifier.CHANGED))
+        self.assertEqual(
+            ["yyy"], other_changes.file_state.get_line_modifiers(0).get_modifier_files(LineModifier.CHANGED)
+        )
+
 
 class NDiffChangesTest(unittest.TestCase):
     def setUp(self):
@@ -531,3 +564,115 @@ class UnifiedDiffChangesTest(unittest.TestCase):
         self.assertDictEqual(
             {-1: [], 0: [("new.txt", "SAME")], 1: [("new.txt", "SAME")], 2: [("new.txt", "REMOVED")]}, changes_dict
         )
+
+    def test_unchanged(self):
+        base_content = ["line1\n", "line2\n"]
+        changes = UnifiedDiffChanges("base.txt", base_content)
+
+        changed = changes.add_diff("new.txt", ["line1\n", "line2\n"])
+
+        self.assertFalse(changed)
+        self.assertEqual(0, changes.count_changes())
+        changes_dict = changes.to_dict_raw()
+        self.assertDictEqual({-1: [], 0: [("new.txt", "SAME")], 1: [("new.txt", "SAME")]}, changes_dict)
+        self.assertEqual(
+            [(1, "line1\n", LineModifier.SAME, None), (2, "line2\n", LineModifier.SAME, None)], changes.to_list_raw()
+        )
+
+    def test_unchanged_mixed(self):
+        base_content = ["line1\n", "line2\n", "line3\n"]
+        changes = UnifiedDiffChanges("base.txt", base_content)
+        changes.add_diff("same1.txt", base_content)
+        changes.add_diff("new.txt", ["line1\n", "new_line\n", "line2\n", "line3x\n"])
+        changes.add_diff("same2.txt", base_content)
+
+        changes_dict = changes.to_dict_raw()
+        self.assertDictEqual(
+            {
+                -1: [],
+                0: [("same1.txt", "SAME"), ("new.txt", "SAME"), ("new.txt", "ADDED"), ("same2.txt", "SAME")],
+                1: [("same1.txt", "SAME"), ("new.txt", "SAME"), ("same2.txt", "SAME")],
+                2: [("same1.txt", "SAME"), ("new.txt", "CHANGED"), ("same2.txt", "SAME")],
+            },
+            changes_dict,
+        )
+        self.assertEqual(
+            [
+                (1, "line1\n", LineModifier.SAME, None),
+                (None, "", LineModifier.ADDED, ["new.txt"]),
+                (2, "line2\n", LineModifier.SAME, None),
+                (3, "line3\n", LineModifier.CHANGED, ["new.txt"]),
+            ],
+            changes.to_list_raw(),
+        )
+        self.assertEqual(2, changes.count_changes())
+
+    def test_counters(self):
+        base_content = [f"line{index}\n" for index in range(0, 10)]
+        variants = {
+            "aaa": [["new\n"] + base_content, base_content[:3] + ["x\n", "y\n"] + base_content[5:]],
+            "bbb": [base_content[1:], base_content[:4] + ["new\n"] + base_content[4:9]],
+            "ccc": [base_content, base_content[:2] + ["x\n"] + base_content[3:]],
+        }
+        changes = UnifiedDiffChanges("base.txt", base_content)
+        for label, contents_list in variants.items():
+            for new_content in contents_list:
+                changes.add_diff(label, new_content)
+
+        ## counters have to be equal to states of all lines
+        modifiers_dict = changes.to_dict_modifiers()
+        for label in list(variants.keys()) + [None]:
+            expected = sum(item.count_changes(label) for item in modifiers_dict.values())
+            self.assertEqual(expected, changes.count_changes(label))
+        expected = sum(1 for item in modifiers_dict.values() if item.count_changes() > 0)
+        self.assertEqual(expected, changes.count_changed_lines())
+        self.assertEqual(6, changes.count_changed_lines())
+
+    def test_count_diff_changes(self):
+        base_content = [f"line{index}\n" for index in range(0, 6)]
+        variants_list = [
+            base_content,
+            ["new\n"] + base_content,
+            ["x\n", "y\n"] + base_content[1:],
+            ["x\n"] + base_content[2:],
+            base_content[:2] + ["x\n", "y\n", "z\n"] + base_content[4:],
+            base_content[:3] + ["x\n"] + base_content[5:] + ["new\n"],
+        ]
+        for new_content in variants_list:
+            changes = UnifiedDiffChanges("base.txt", base_content)
+            raw_diff = changes.calculate_diff(new_content)
+            changes.parse_diff(None, raw_diff)
+            self.assertEqual(changes.count_changes(), count_diff_changes(raw_diff))
+
+    def test_parse_diff_iterator(self):
+        base_content = [f"line{index}\n" for index in range(0, 6)]
+        new_content = ["x\n"] + base_content[2:4] + ["y\n"] + base_content[4:]
+        list_changes = UnifiedDiffChanges("base.txt", base_content)
+        raw_diff = list_changes.calculate_diff(new_content)
+        list_changes.parse_diff("new", raw_diff)
+        list_changes.parse_diff("same", [])
+
+        iter_changes = UnifiedDiffChanges("base.txt", base_content)
+        iter_changes.parse_diff("new", iter(raw_diff))
+        iter_changes.parse_diff("same", iter([]))
+
+        self.assertEqual(list_changes.file_state.to_dict_raw(), iter_changes.file_state.to_dict_raw())
+        self.assertEqual(count_diff_changes(raw_diff), count_diff_changes(iter(raw_diff)))
+        self.assertEqual(print_unified_diff_list(raw_diff), "".join(iterate_unified_diff_text(iter(raw_diff))))
+
+    def test_read_unified_diff(self):
+        base_content = [f"line{index}\n".encode() for index in range(0, 6)]
+        ## last line without new line
+        new_content = [b"x\n"] + base_content[2:4] + [b"y\n"] + base_content[4:5] + [b"line5"]
+        raw_diff = UnifiedDiffChanges("base.txt", base_content).calculate_diff(new_content)
+        out_file = io.BytesIO()
+        write_unified_diff(out_file, raw_diff)
+        read_diff = read_unified_diff(io.BytesIO(out_file.getvalue()))
+        self.assertEqual(count_diff_changes(raw_diff), count_diff_changes(read_diff))
+
+        list_changes = UnifiedDiffChanges("base.txt", base_content)
+        list_changes.parse_diff("new", raw_diff)
+        read_changes = UnifiedDiffChanges("base.txt", base_content)
+        read_changes.parse_diff("new", read_diff)
+        self.assertEqual(list_changes.file_state.to_dict_raw(), read_changes.file_state.to_dict_raw())
+        self.assertEqual([], read_unified_diff(io.BytesIO(b"")))
@@ -0,0 +1,43 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import unittest
+
+from uncrustimpact.fittool import get_racing_rounds, race_variants, is_clearly_worse
+
+
+class RacingTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_get_racing_rounds(self):
+        self.assertEqual([10], get_racing_rounds(10))
+        self.assertEqual([10], get_racing_rounds(10, 0))
+        self.assertEqual([2, 6, 10], get_racing_rounds(10, 2))
+        self.assertEqual([3], get_racing_rounds(3, 4))
+
+    def test_is_clearly_worse(self):
+        self.assertTrue(is_clearly_worse([5, 5, 5, 5]))
+        self.assertFalse(is_clearly_worse([5, 5, 5]))
+        self.assertFalse(is_clearly_worse([0, 0, 0, 0]))
+        self.assertFalse(is_clearly_worse([0, 0, 0, 20, 0, 0]))
+
+    def test_race_variants(self):
+        units_changes = [
+            [1, 2, 1, 2, 9],
+            [3, 4, 3, 4, 0],
+            [1, 2, 1, 2, 0],
+        ]
+        self.assertEqual([1], race_variants([0, 1, 2], units_changes, [0, 1, 2, 3]))
+        self.assertEqual([], race_variants([0, 1, 2], units_changes, [4]))
+        self.assertEqual([], race_variants([1], units_changes, [0, 1, 2, 3]))
@@ -0,0 +1,45 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import unittest
+
+from uncrustimpact.languages import get_file_language, get_param_languages, is_language_relevant
+
+
+class LanguagesTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_get_file_language(self):
+        self.assertEqual("CPP", get_file_language("/aaa/bbb.cpp"))
+        self.assertEqual("CPP", get_file_language("/aaa/bbb.H"))
+        self.assertEqual("C", get_file_language("/aaa.d/bbb.c"))
+        self.assertEqual("JAVA", get_file_language("bbb.java"))
+        self.assertEqual("CPP", get_file_language("bbb.txt"))
+        self.assertEqual("PAWN", get_file_language("bbb.sma"))
+        self.assertEqual("CPP", get_file_language("bbb.inc"))
+        self.assertEqual("CPP", get_file_language("bbb.p"))
+
+    def test_get_param_languages(self):
+        param_def = {"doc": "# (OC) Add or remove space after the scope '+' or '-'.\n"}
+        self.assertEqual({"OC", "OC+"}, get_param_languages("sp_after_oc_scope", param_def))
+        param_def = {"doc": "# (C++11) Permit removal of the space between '>>'.\n"}
+        self.assertIsNone(get_param_languages("sp_permit_cpp11_shift", param_def))
+        param_def = {"doc": "# Add or remove space around assignment operator '='.\n"}
+        self.assertIsNone(get_param_languages("sp_assign", param_def))
+        self.assertEqual({"VALA"}, get_param_languages("sp_vala_after_translation", {"doc": ""}))
+
+    def test_is_language_relevant(self):
+        self.assertTrue(is_language_relevant(None, "CPP"))
+        self.assertTrue(is_language_relevant(frozenset(["CS", "VALA"]), "CS"))
+        self.assertFalse(is_language_relevant(frozenset(["CS", "VALA"]), "CPP"))
@@ -0,0 +1,86 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import time
+import unittest
+import tempfile
+
+from uncrustimpact.resultcache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        self.config_path = os.path.join(self.temp_dir.name, "config.cfg")
+        with open(self.config_path, "w", encoding="utf-8") as config_file:
+            config_file.write("indent_columns = 4\n")
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.temp_dir.cleanup()
+
+    def test_get_missing(self):
+        cache = ResultCache(self.cache_dir, tool_id="test")
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path))
+
+    def test_put_get(self):
+        cache = ResultCache(self.cache_dir, tool_id="test")
+        cache.put(b"aaa\n", self.config_path, b"bbb\n", [b"@@ -1 +1 @@", b"-aaa\n", b"+b\xe9b\n"])
+        cache.put(b"ccc\n", self.config_path, b"ccc\n", [])
+
+        self.assertEqual((b"bbb\n", [b"@@ -1 +1 @@", b"-aaa\n", b"+b\xe9b\n"]), cache.get(b"aaa\n", self.config_path))
+        self.assertEqual((b"ccc\n", []), cache.get(b"ccc\n", self.config_path))
+
+    def test_override_params(self):
+        cache = ResultCache(self.cache_dir, tool_id="test")
+        cache.put(b"aaa\n", self.config_path, b"bbb\n", [], override_params={"indent_columns": 2})
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path))
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path, override_params={"indent_columns": 3}))
+        cached_result = cache.get(b"aaa\n", self.config_path, override_params={"indent_columns": 2})
+        self.assertEqual((b"bbb\n", []), cached_result)
+
+    def test_get_other_tool(self):
+        cache = ResultCache(self.cache_dir, tool_id="test")
+        cache.put(b"aaa\n", self.config_path, b"bbb\n", [])
+        cache = ResultCache(self.cache_dir, tool_id="other")
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path))
+
+    def test_get_config_changed(self):
+        cache = ResultCache(self.cache_dir, tool_id="test")
+        cache.put(b"aaa\n", self.config_path, b"bbb\n", [])
+        with open(self.config_path, "w", encoding="utf-8") as config_file:
+            config_file.write("indent_columns = 8\n")
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path))
+
+    def test_trim(self):
+        cache = ResultCache(self.cache_dir, max_size=0, tool_id="test")
+        cache.put(b"aaa\n", self.config_path, b"bbb\n", [])
+        cache.trim()
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path))
+
+    def test_trim_lru(self):
+        cache = ResultCache(self.cache_dir, tool_id="test")
+        cache.put(b"aaa\n", self.config_path, b"aaa\n", [])
+        cache.put(b"bbb\n", self.config_path, b"bbb\n", [])
+        past_time = time.time() - 100
+        for root_dir, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                os.utime(os.path.join(root_dir, file_name), (past_time, past_time))
+        ## access makes entry recently used
+        cache.get(b"bbb\n", self.config_path)
+
+        ## limit allows to keep only one entry
+        entry_size = len(b'{"output": "", "diff": []}') + 64
+        cache.max_size = entry_size
+        cache.trim()
+
+        self.assertEqual(None, cache.get(b"aaa\n", self.config_path))
+        self.assertEqual((b"bbb\n", []), cache.get(b"bbb\n", self.config_path))
@@ -0,0 +1,160 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import sys
+import json
+import unittest
+import tempfile
+
+from uncrustimpact.runner import split_lines, decode_content, get_set_options, write_data
+from uncrustimpact.runner import execute_uncrustify_batch, UncrustifyError
+from uncrustimpact.resultcache import format_files_batch
+
+
+## stub of uncrustify: logs its arguments, working directory and content of files list,
+## formats each listed file by converting it to upper case and stores result under '--prefix'
+STUB_UNCRUSTIFY = """\
+import os
+import sys
+import json
+
+args = sys.argv[1:]
+list_path = args[args.index("-F") + 1]
+prefix_path = args[args.index("--prefix") + 1]
+with open(list_path, encoding="utf-8") as list_file:
+    files_list = list_file.read().splitlines()
+with open(os.environ["STUB_UNCRUSTIFY_LOG"], "a", encoding="utf-8") as log_file:
+    log_file.write(json.dumps({"args": args, "cwd": os.getcwd(), "files": files_list}) + "\\n")
+if os.environ.get("STUB_UNCRUSTIFY_FAIL"):
+    sys.stderr.write("stub failure\\n")
+    sys.exit(3)
+for file_path in files_list:
+    with open(file_path, "rb") as input_file:
+        content = input_file.read()
+    with open(os.path.join(prefix_path, file_path), "wb") as output_file:
+        output_file.write(content.upper())
+"""
+
+
+class RunnerTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_split_lines(self):
+        lines_list = split_lines(b"aaa\r\nbbb\rccc\n\nddd")
+        self.assertEqual([b"aaa\n", b"bbb\n", b"ccc\n", b"\n", b"ddd"], lines_list)
+
+    def test_decode_content(self):
+        self.assertEqual("café", decode_content("café".encode("utf-8")))
+        self.assertEqual("café", decode_content("café".encode("latin-1")))
+        self.assertEqual("cafй", decode_content("cafй".encode("cp1251"), "cp1251"))
+
+    def test_get_set_options(self):
+        self.assertEqual([], get_set_options(None))
+        options = get_set_options({"indent_columns": 2, "sp_assign": "add"})
+        self.assertEqual(["--set", "indent_columns=2", "--set", "sp_assign=add"], options)
+
+
+class RunnerBatchTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        bin_dir = os.path.join(self.temp_dir.name, "bin")
+        os.makedirs(bin_dir)
+        stub_path = os.path.join(bin_dir, "uncrustify")
+        with open(stub_path, "w", encoding="utf-8") as stub_file:
+            stub_file.write(f"#!{sys.executable}\n")
+            stub_file.write(STUB_UNCRUSTIFY)
+        os.chmod(stub_path, 0o755)
+
+        self.log_path = os.path.join(self.temp_dir.name, "log.txt")
+        self.prev_environ = dict(os.environ)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+        os.environ["STUB_UNCRUSTIFY_LOG"] = self.log_path
+        os.environ.pop("STUB_UNCRUSTIFY_FAIL", None)
+
+        self.config_path = os.path.join(self.temp_dir.name, "config.cfg")
+        write_data(self.config_path, b"indent_columns = 4\n")
+        self.input_dir = os.path.join(self.temp_dir.name, "input")
+        self.out_dir = os.path.join(self.temp_dir.name, "output")
+        os.makedirs(os.path.join(self.input_dir, "sub"))
+        os.makedirs(self.out_dir)
+        self.files_list = [os.path.join(self.input_dir, "aaa.cpp"), os.path.join(self.input_dir, "sub", "bbb.h")]
+        write_data(self.files_list[0], b"aaa\nbbb\n")
+        write_data(self.files_list[1], b"ccc\n")
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        os.environ.clear()
+        os.environ.update(self.prev_environ)
+        self.temp_dir.cleanup()
+
+    def read_log(self):
+        with open(self.log_path, encoding="utf-8") as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_execute_batch(self):
+        out_dict = execute_uncrustify_batch(self.files_list, self.config_path, self.out_dir, {"sp_assign": "add"})
+
+        self.assertEqual(
+            {
+                self.files_list[0]: os.path.join(self.out_dir, "aaa.cpp"),
+                self.files_list[1]: os.path.join(self.out_dir, "sub", "bbb.h"),
+            },
+            out_dict,
+        )
+        with open(out_dict[self.files_list[0]], "rb") as out_file:
+            self.assertEqual(b"AAA\nBBB\n", out_file.read())
+
+        log_list = self.read_log()
+        self.assertEqual(1, len(log_list))
+        log_item = log_list[0]
+        self.assertEqual(self.input_dir, log_item["cwd"])
+        self.assertEqual(["aaa.cpp", os.path.join("sub", "bbb.h")], log_item["files"])
+        args = log_item["args"]
+        list_path = args[args.index("-F") + 1]
+        expected_args = ["-q", "-c", self.config_path, "-l", "CPP", "-F", list_path, "--prefix", self.out_dir]
+        expected_args += ["--set", "sp_assign=add"]
+        self.assertEqual(expected_args, args)
+        self.assertNotIn("--no-backup", args)
+        ## list of files is removed
+        self.assertFalse(os.path.exists(list_path))
+
+    def test_execute_batch_languages(self):
+        c_file_path = os.path.join(self.input_dir, "ccc.c")
+        write_data(c_file_path, b"ddd\n")
+        out_dict = execute_uncrustify_batch(self.files_list + [c_file_path], self.config_path, self.out_dir)
+        self.assertEqual(os.path.join(self.out_dir, "ccc.c"), out_dict[c_file_path])
+
+        log_list = self.read_log()
+        self.assertEqual(2, len(log_list))
+        languages = {item["args"][item["args"].index("-l") + 1]: item["files"] for item in log_list}
+        self.assertEqual({"CPP": ["aaa.cpp", os.path.join("sub", "bbb.h")], "C": ["ccc.c"]}, languages)
+
+    def test_execute_batch_error(self):
+        os.environ["STUB_UNCRUSTIFY_FAIL"] = "1"
+        with self.assertRaises(UncrustifyError) as context:
+            execute_uncrustify_batch(self.files_list, self.config_path, self.out_dir)
+        self.assertEqual(3, context.exception.return_code)
+        self.assertIn("stub failure", context.exception.stderr_output)
+        self.assertEqual([], [name for name in os.listdir(self.out_dir) if name.startswith("files-")])
+
+    def test_format_files_batch(self):
+        results_dict = format_files_batch(self.files_list, self.config_path, self.out_dir)
+        self.assertEqual(set(self.files_list), set(results_dict.keys()))
+        output_data, raw_diff = results_dict[self.files_list[1]]
+        self.assertEqual(b"CCC\n", output_data)
+        self.assertEqual([b"-ccc\n", b"+CCC\n"], raw_diff[-2:])
+        ## temporary batch directory is removed
+        self.assertEqual([], os.listdir(self.out_dir))
@@ -0,0 +1,74 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import unittest
+import tempfile
+
+from uncrustimpact.screening import split_to_groups, merge_override_params, select_sample, calculate_prune_bound
+from uncrustimpact.runner import write_data
+
+
+class ScreeningTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        pass
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        pass
+
+    def test_split_to_groups(self):
+        variants_list = [
+            (0, {"aaa": "1"}),
+            (1, {"aaa": "2"}),
+            (2, {"bbb": "1"}),
+            (3, {"ccc": "1"}),
+            (4, {"ddd": "1"}),
+        ]
+        groups_list = split_to_groups(variants_list, 3)
+        self.assertEqual([[0, 2, 3], [1, 4]], [[item[0] for item in group] for group in groups_list])
+        for group in groups_list:
+            self.assertEqual(sum(len(item[1]) for item in group), len(merge_override_params(group)))
+
+    def test_split_to_groups_invalid(self):
+        variants_list = [(0, {"aaa": "1"}), (1, {"bbb": "1"}), (2, {"ccc": "1"})]
+        groups_list = split_to_groups(variants_list, 3, lambda params: "bbb" not in params or "aaa" not in params)
+        self.assertEqual([[0, 2], [1]], [[item[0] for item in group] for group in groups_list])
+
+
+class SampleScreeningTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.files_paths = []
+        for dir_name, files_num in [("aaa", 6), ("bbb", 3), ("ccc", 1)]:
+            dir_path = os.path.join(self.temp_dir.name, dir_name)
+            os.makedirs(dir_path)
+            for file_index in range(0, files_num):
+                file_path = os.path.join(dir_path, f"file{file_index}.cpp")
+                write_data(file_path, b"x" * (file_index + 1))
+                self.files_paths.append(file_path)
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.temp_dir.cleanup()
+
+    def test_select_sample(self):
+        sample = select_sample(self.files_paths, 5, seed=1)
+        self.assertEqual(5, len(sample))
+        self.assertEqual(sample, sorted(set(sample)))
+        self.assertEqual(sample, select_sample(self.files_paths, 5, seed=1))
+        dirs_list = [os.path.basename(os.path.dirname(self.files_paths[index])) for index in sample]
+        self.assertEqual(3, dirs_list.count("aaa"))
+        self.assertEqual(list(range(0, 10)), select_sample(self.files_paths, 0))
+        self.assertEqual(list(range(0, 10)), select_sample(self.files_paths, 20))
+
+    def test_calculate_prune_bound(self):
+        self.assertAlmostEqual(0.0295, calculate_prune_bound(100), places=4)
+        self.assertEqual(1.0, calculate_prune_bound(0))
@@ -0,0 +1,65 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import unittest
+import tempfile
+
+from uncrustimpact.runner import split_lines, write_data
+from uncrustimpact.sourcefile import SourceFile, get_source_file
+from uncrustimpact.filediff import UnifiedDiffChanges
+from uncrustimpact.fileutils import calculate_hash
+
+
+class SourceFileTest(unittest.TestCase):
+    def setUp(self):
+        ## Called before testfunction is executed
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.file_path = os.path.join(self.temp_dir.name, "input.cpp")
+
+    def tearDown(self):
+        ## Called after testfunction was executed
+        self.temp_dir.cleanup()
+
+    def test_lines(self):
+        for content_data in [b"", b"aaa", b"aaa\nbbb\n\nccc", b"aaa\r\nbbb\rccc\n"]:
+            write_data(self.file_path, content_data)
+            source = SourceFile(self.file_path)
+            expected_lines = split_lines(content_data)
+            self.assertEqual(len(expected_lines), len(source))
+            self.assertEqual(expected_lines, source.lines)
+            for index, line in enumerate(expected_lines):
+                self.assertEqual(line, source.get_line_view(index))
+                self.assertEqual(hash(line), source.get_line_hash(index))
+            source.close()
+
+    def test_data(self):
+        for content_data in [b"", b"aaa\nbbb\n", b"aaa\r\nbbb\rccc\n"]:
+            write_data(self.file_path, content_data)
+            source = SourceFile(self.file_path)
+            ## raw content is not translated
+            self.assertEqual(content_data, source.data)
+            self.assertEqual(calculate_hash(content_data), source.data_hash)
+            ids, _ = source.lines.get_ids()
+            self.assertEqual(len(source), len(ids))
+            source.close()
+
+    def test_get_source_file(self):
+        write_data(self.file_path, b"aaa\nbbb\n")
+        source = get_source_file(self.file_path)
+        self.assertIs(source, get_source_file(self.file_path))
+        write_data(self.file_path, b"aaa\nbbb\nccc\n")
+        source = get_source_file(self.file_path)
+        self.assertEqual([b"aaa\n", b"bbb\n", b"ccc\n"], source.lines)
+
+    def test_changes(self):
+        write_data(self.file_path, b"aaa\nbbb\nccc\n")
+        changes = UnifiedDiffChanges("base", SourceFile(self.file_path))
+        changes.add_diff("label", [b"aaa\n", b"ccc\n", b"ddd\n"])
+        self.assertEqual(2, changes.count_changes())
+        self.assertEqual(b"bbb\n", changes.get_content_line(1))
@@ -8,14 +8,25 @@
 
 import sys
 import os
+import logging
 from enum import Enum, unique
 
 import re
 import json
+import io
+import shutil
+import pickle  # nosec
+
+import subprocess  # nosec
+
+from uncrustimpact.runner import get_uncrustify_id
+from uncrustimpact.fileutils import calculate_hash, write_atomic
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+_LOGGER = logging.getLogger(__name__)
+
 
 @unique
 class ParamType(str, Enum):
@@ -45,9 +56,81 @@ def prepare_params_space_dict(params_space_path=None, override_def_params_space=
 
 
 def get_default_params_space():
-    default_cfg_path = "/tmp/uncrustify_show-config.txt"  # nosec
-    generate_default_config(default_cfg_path)
-    return read_params_space(default_cfg_path)
+    default_data = get_default_config_data()
+    return default_data["params_space"]
+
+
+## returns dict with default config lines and params space of uncrustify binary
+## data is stored in persistent cache (keyed by uncrustify location, modification time and size),
+## so uncrustify is not executed and its output is not parsed again while the binary does not change
+## version of the binary is stored in cache entry
+def get_default_config_data(cache_dir_path=None):
+    binary_id = get_uncrustify_binary_id()
+    if binary_id is None:
+        ## uncrustify not found
+        config_lines = generate_default_config_lines()
+        return {"binary_id": None, "config_lines": config_lines, "params_space": parse_params_space(config_lines)}
+
+    if cache_dir_path is None:
+        cache_dir_path = get_params_cache_dir()
+    entry_name = calculate_hash(binary_id.encode("utf-8"))
+    entry_path = os.path.join(cache_dir_path, f"{entry_name}.pickle")
+    default_data = load_default_config_data(entry_path, binary_id)
+    if default_data is not None:
+        return default_data
+
+    config_lines = generate_default_config_lines()
+    default_data = {
+        "binary_id": binary_id,
+        "tool_id": get_uncrustify_id(),
+        "config_lines": config_lines,
+        "params_space": parse_params_space(config_lines),
+    }
+    try:
+        write_atomic(entry_path, pickle.dumps(default_data, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError as exc:
+        _LOGGER.warning("unable to store params space in cache: %s", exc)
+    return default_data
+
+
+def load_default_config_data(entry_path, binary_id):
+    try:
+        with open(entry_path, "rb") as entry_file:
+            default_data = pickle.load(entry_file)  # nosec
+    except FileNotFoundError:
+        return None
+    except (
+        OSError,
+        EOFError,
+        ValueError,
+        TypeError,
+        KeyError,
+        IndexError,
+        pickle.UnpicklingError,
+        AttributeError,
+        ImportError,
+    ) as exc:
+        _LOGGER.warning("unable to load params space from cache: %s", exc)
+        return None
+    if not isinstance(default_data, dict) or default_data.get("binary_id") != binary_id:
+        return None
+    return default_data
+
+
+## identify uncrustify binary without executing it, returns None if binary is not found
+def get_uncrustify_binary_id():
+    binary_path = shutil.which("uncrustify")
+    if binary_path is None:
+        return None
+    binary_stat = os.stat(binary_path)
+    return f"{binary_path}:{binary_stat.st_mtime_ns}:{binary_stat.st_size}"
+
+
+def get_params_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "uncrustimpact", "params_space")
 
 
 def load_params_space_json(params_space_path):
@@ -67,7 +150,10 @@ def load_params_space_json(params_space_path):
 def read_params_space(cfg_path):
     with open(cfg_path, encoding="utf-8") as item_file:
         lines_list = item_file.readlines()
+    return parse_params_space(lines_list)
 
+
+def parse_params_space(lines_list):
     all_params_dict = {}
 
     recent_comments = ""
@@ -154,8 +240,8 @@ def convert_value(value_str, value_type: ParamType):
 def read_config_content(config_path):
     if not config_path:
         # read default config
-        config_path = "/tmp/uncrustify_show-config.txt"  # nosec
-        generate_default_config(config_path)
+        default_data = get_default_config_data()
+        return list(default_data["config_lines"])
 
     # read lines
     with open(config_path, encoding="utf-8") as item_file:
@@ -163,9 +249,20 @@ def read_config_content(config_path):
 
 
 def generate_default_config(config_path):
-    error_code = os.system(f"uncrustify --show-config > {config_path}")  # nosec
-    if error_code != 0:
+    config_lines = generate_default_config_lines()
+    write_config_content(config_path, config_lines)
+
+
+## default config printed by uncrustify (received directly from stdout - no temporary file is needed)
+def generate_default_config_lines():
+    try:
+        result = subprocess.run(["uncrustify", "--show-config"], capture_output=True, check=False)  # nosec
+    except OSError as exc:
+        raise RuntimeError("unable to execute uncrustify") from exc
+    if result.returncode != 0:
         raise RuntimeError("unable to execute uncrustify")
+    ## split lines as 'readlines()' of file opened in text mode
+    return io.StringIO(result.stdout.decode("utf-8"), newline=None).readlines()
 
 
 def modify_config_params(config_lines, params_dict):
@@ -287,6 +384,16 @@ def write_dict_to_cfg(params_dict, out_path):
         out_file.write(content)
 
 
+## write config that includes other config and overrides given parameters
+def write_overlay_cfg(include_cfg_path, params_dict, out_path):
+    include_cfg_path = os.path.abspath(include_cfg_path)
+    with open(out_path, "w", encoding="utf-8") as out_file:
+        content = f"""include "{include_cfg_path}"\n"""
+        for param_name, param_val in params_dict.items():
+            content += f"""{param_name} = {param_val}\n"""
+        out_file.write(content)
+
+
 ## ========================================================
 
 
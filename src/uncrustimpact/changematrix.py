@@ -0,0 +1,213 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+from typing import List, Dict
+
+try:
+    import numpy
+except ImportError:
+    ## numpy is optional - bitsets are used instead
+    numpy = None
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+## modifiers encoded as bit flags, SAME is not stored
+STATE_CHANGED = 1
+STATE_ADDED = 2
+STATE_REMOVED = 4
+STATE_MODIFIED = STATE_CHANGED | STATE_REMOVED
+
+STATES_LIST = [STATE_CHANGED, STATE_ADDED, STATE_REMOVED]
+
+
+def count_bits(value):
+    return bin(value).count("1")
+
+
+## matrix of lines and labels holding set of modifiers in each cell
+## row 0 is placeholder before first line, row 'index + 1' is line 'index'
+## labels are interned to integer ids (ids are also used by line states of file, see "filediff.LineModifiers")
+## change counters are updated when state is added, so reading them is O(1)
+class ChangeMatrix:
+    def __init__(self, length):
+        self.length = length
+        self.labels: List[str] = []
+        self.label_ids: Dict[str, int] = {}
+        ## number of distinct modifiers of each label summed over lines
+        self.label_changes: List[int] = []
+        ## number of distinct modifiers (of any label) summed over lines
+        self.total_changes = 0
+        ## number of lines having any modifier
+        self.changed_lines = 0
+
+    def get_label_id(self, label_name):
+        label_id = self.label_ids.get(label_name)
+        if label_id is None:
+            label_id = len(self.labels)
+            self.labels.append(label_name)
+            self.label_ids[label_name] = label_id
+            self.label_changes.append(0)
+            self._add_label()
+        return label_id
+
+    ## 'line_index' equal -1 means position before first line
+    def add_state(self, line_index, label_name, state_code):
+        label_id = self.get_label_id(label_name)
+        row_index = line_index + 1
+        cell_state = self._get_cell(row_index, label_id)
+        new_cell_state = cell_state | state_code
+        if new_cell_state == cell_state:
+            return
+        row_state = self._get_row_state(row_index)
+        self._set_cell(row_index, label_id, new_cell_state)
+
+        self.label_changes[label_id] += count_bits(new_cell_state) - count_bits(cell_state)
+        new_row_state = row_state | state_code
+        if new_row_state != row_state:
+            self.total_changes += count_bits(new_row_state) - count_bits(row_state)
+            if row_state == 0:
+                self.changed_lines += 1
+
+    ## number of distinct modifiers in lines of given label (or any label if None)
+    def count_changes(self, label_name=None) -> int:
+        if label_name is None:
+            return self.total_changes
+        label_id = self.label_ids.get(label_name)
+        if label_id is None:
+            return 0
+        return self.label_changes[label_id]
+
+    def count_changed_lines(self) -> int:
+        return self.changed_lines
+
+    ## modifiers of line joined over all labels
+    def get_line_state(self, line_index) -> int:
+        return self._get_row_state(line_index + 1)
+
+    ## number of distinct modifiers of line
+    def count_line_changes(self, line_index) -> int:
+        return count_bits(self.get_line_state(line_index))
+
+    ## labels (in order of interning) having any of given modifiers in line
+    def get_line_labels(self, line_index, state_mask) -> List[str]:
+        raise NotImplementedError("not implemented")
+
+    def _add_label(self):
+        raise NotImplementedError("not implemented")
+
+    def _get_cell(self, row_index, label_id) -> int:
+        raise NotImplementedError("not implemented")
+
+    def _set_cell(self, row_index, label_id, state_code):
+        raise NotImplementedError("not implemented")
+
+    def _get_row_state(self, row_index) -> int:
+        raise NotImplementedError("not implemented")
+
+
+## pure python implementation - each row keeps integer bitset of label ids per modifier
+class BitsetChangeMatrix(ChangeMatrix):
+    def __init__(self, length):
+        super().__init__(length)
+        ## row -> bitsets of label ids
+        self._rows: Dict[int, List[int]] = {}
+
+    def get_line_labels(self, line_index, state_mask) -> List[str]:
+        row_bitsets = self._rows.get(line_index + 1)
+        if row_bitsets is None:
+            return []
+        labels_bitset = 0
+        for state_index, state_code in enumerate(STATES_LIST):
+            if state_mask & state_code:
+                labels_bitset |= row_bitsets[state_index]
+        ret_list = []
+        label_id = 0
+        while labels_bitset:
+            if labels_bitset & 1:
+                ret_list.append(self.labels[label_id])
+            labels_bitset >>= 1
+            label_id += 1
+        return ret_list
+
+    def _add_label(self):
+        pass
+
+    def _get_cell(self, row_index, label_id) -> int:
+        row_bitsets = self._rows.get(row_index)
+        if row_bitsets is None:
+            return 0
+        state = 0
+        for state_index, state_code in enumerate(STATES_LIST):
+            if (row_bitsets[state_index] >> label_id) & 1:
+                state |= state_code
+        return state
+
+    def _set_cell(self, row_index, label_id, state_code):
+        row_bitsets = self._rows.get(row_index)
+        if row_bitsets is None:
+            row_bitsets = [0, 0, 0]
+            self._rows[row_index] = row_bitsets
+        label_bit = 1 << label_id
+        for state_index, item_code in enumerate(STATES_LIST):
+            if state_code & item_code:
+                row_bitsets[state_index] |= label_bit
+            else:
+                row_bitsets[state_index] &= ~label_bit
+
+    def _get_row_state(self, row_index) -> int:
+        row_bitsets = self._rows.get(row_index)
+        if row_bitsets is None:
+            return 0
+        state = 0
+        for state_index, state_code in enumerate(STATES_LIST):
+            if row_bitsets[state_index]:
+                state |= state_code
+        return state
+
+
+## numpy implementation - dense array of rows and labels
+class ArrayChangeMatrix(ChangeMatrix):
+    def __init__(self, length):
+        super().__init__(length)
+        self._data = numpy.zeros((length + 1, 16), dtype=numpy.uint8)
+        ## modifiers of each row joined over labels
+        self._rows_state = numpy.zeros(length + 1, dtype=numpy.uint8)
+
+    def get_line_labels(self, line_index, state_mask) -> List[str]:
+        labels_num = len(self.labels)
+        row = self._data[line_index + 1, :labels_num]
+        found_ids = numpy.flatnonzero(row & state_mask)
+        return [self.labels[label_id] for label_id in found_ids]
+
+    def _add_label(self):
+        labels_num = len(self.labels)
+        capacity = self._data.shape[1]
+        if labels_num <= capacity:
+            return
+        data = numpy.zeros((self.length + 1, capacity * 2), dtype=numpy.uint8)
+        data[:, :capacity] = self._data
+        self._data = data
+
+    def _get_cell(self, row_index, label_id) -> int:
+        return int(self._data[row_index, label_id])
+
+    def _set_cell(self, row_index, label_id, state_code):
+        self._data[row_index, label_id] = state_code
+        self._rows_state[row_index] |= state_code
+
+    def _get_row_state(self, row_index) -> int:
+        return int(self._rows_state[row_index])
+
+
+def create_change_matrix(length) -> ChangeMatrix:
+    if numpy is not None:
+        return ArrayChangeMatrix(length)
+    return BitsetChangeMatrix(length)
@@ -0,0 +1,446 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+from typing import List, Dict, Iterator
+
+import difflib
+import bisect
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+DEFAULT_DIFF_ENGINE = "difflib"
+
+
+## calculates unified diff without context lines (as 'difflib.unified_diff(n=0, lineterm="")')
+## the diff is consumed by 'UnifiedDiffFileState' and 'count_diff_changes'
+## lines can be strings or bytes - items of diff are of the same type as lines
+class DiffEngine:
+    def calculate_unified_diff(self, base_lines, content_lines) -> List[str]:
+        return list(self.iterate_unified_diff(base_lines, content_lines))
+
+    ## diff lines are generated lazily
+    def iterate_unified_diff(self, base_lines, content_lines) -> Iterator[str]:
+        opcodes = self.get_opcodes(base_lines, content_lines)
+        return format_unified_diff(opcodes, base_lines, content_lines)
+
+    ## list of tuples (tag, i1, i2, j1, j2) as in 'difflib.SequenceMatcher.get_opcodes()'
+    ## 'equal' opcodes are optional
+    def get_opcodes(self, base_lines, content_lines):
+        raise NotImplementedError("not implemented")
+
+
+class DifflibDiffEngine(DiffEngine):
+    def iterate_unified_diff(self, base_lines, content_lines) -> Iterator[str]:
+        if is_bytes_lines(base_lines, content_lines):
+            return difflib.diff_bytes(difflib.unified_diff, base_lines, content_lines, n=0, lineterm=b"")
+        return difflib.unified_diff(base_lines, content_lines, n=0, lineterm="")
+
+    def get_opcodes(self, base_lines, content_lines):
+        matcher = difflib.SequenceMatcher(None, base_lines, content_lines)
+        return matcher.get_opcodes()
+
+
+## Myers O(ND) algorithm (linear space variant) working on lines interned to integers
+## hunks can be placed differently than by difflib (both are valid), but number of changed lines is minimal
+class MyersDiffEngine(DiffEngine):
+    def get_opcodes(self, base_lines, content_lines):
+        base_ids, content_ids = intern_lines(base_lines, content_lines)
+        matches = calculate_myers_matches(base_ids, content_ids)
+        return matches_to_opcodes(matches, len(base_ids), len(content_ids))
+
+
+## identical runs are skipped, sequences are synchronized on lines unique in both (patience anchors)
+## and exact (Myers) diff is calculated only inside mismatched windows
+## time of diff depends on size of changes rather than on length of file
+class PatienceDiffEngine(DiffEngine):
+    def get_opcodes(self, base_lines, content_lines):
+        blocks = calculate_windowed_blocks(base_lines, content_lines)
+        return blocks_to_opcodes(blocks, len(base_lines), len(content_lines))
+
+
+DIFF_ENGINES = {
+    "difflib": DifflibDiffEngine,
+    "myers": MyersDiffEngine,
+    "patience": PatienceDiffEngine,
+}
+
+_ENGINES_CACHE: Dict[str, DiffEngine] = {}
+
+
+def get_diff_engine(engine_name=None) -> DiffEngine:
+    if not engine_name:
+        engine_name = DEFAULT_DIFF_ENGINE
+    engine = _ENGINES_CACHE.get(engine_name)
+    if engine is None:
+        engine_class = DIFF_ENGINES.get(engine_name)
+        if engine_class is None:
+            raise RuntimeError(f"unknown diff engine: {engine_name}")
+        engine = engine_class()
+        _ENGINES_CACHE[engine_name] = engine
+    return engine
+
+
+def is_bytes_lines(base_lines, content_lines):
+    if base_lines:
+        return isinstance(base_lines[0], bytes)
+    if content_lines:
+        return isinstance(content_lines[0], bytes)
+    return False
+
+
+## list of lines remembering its integer ids (calculated on first use)
+## base lines compared against many contents are interned only once
+class InternedLines(list):
+    def __init__(self, lines_list):
+        super().__init__(lines_list)
+        self._lines_ids: Dict[str, int] = None
+        self._ids: List[int] = None
+
+    ## returns pair (ids of lines, dict mapping line to id)
+    def get_ids(self):
+        if self._ids is None:
+            self._lines_ids = {}
+            self._ids = [self._lines_ids.setdefault(line, len(self._lines_ids)) for line in self]
+        return self._ids, self._lines_ids
+
+
+## replace lines by integer ids, equal lines get equal ids
+def intern_lines(base_lines, content_lines):
+    if isinstance(base_lines, InternedLines):
+        ## ids of base lines are not modified - new lines get ids from separate dict
+        base_ids, base_ids_dict = base_lines.get_ids()
+        new_ids: Dict[str, int] = {}
+        next_id = len(base_ids_dict)
+        content_ids = []
+        for line in content_lines:
+            line_id = base_ids_dict.get(line)
+            if line_id is None:
+                line_id = new_ids.setdefault(line, next_id + len(new_ids))
+            content_ids.append(line_id)
+        return base_ids, content_ids
+    lines_ids: Dict[str, int] = {}
+    base_ids = [lines_ids.setdefault(line, len(lines_ids)) for line in base_lines]
+    content_ids = [lines_ids.setdefault(line, len(lines_ids)) for line in content_lines]
+    return base_ids, content_ids
+
+
+## calculate longest common subsequence, returns list of matching pairs (base index, content index)
+def calculate_myers_matches(base_ids, content_ids):
+    base_len = len(base_ids)
+    content_len = len(content_ids)
+
+    ## common prefix and suffix
+    prefix_len = 0
+    max_prefix = min(base_len, content_len)
+    while prefix_len < max_prefix and base_ids[prefix_len] == content_ids[prefix_len]:
+        prefix_len += 1
+    suffix_len = 0
+    max_suffix = max_prefix - prefix_len
+    while suffix_len < max_suffix and base_ids[base_len - suffix_len - 1] == content_ids[content_len - suffix_len - 1]:
+        suffix_len += 1
+
+    matches = [(index, index) for index in range(0, prefix_len)]
+
+    ## lines existing only in one of sequences can not be part of common subsequence - skip them
+    ## it is important for formatting diffs where most of changed lines are unique
+    base_middle = range(prefix_len, base_len - suffix_len)
+    content_middle = range(prefix_len, content_len - suffix_len)
+    base_set = {base_ids[index] for index in base_middle}
+    content_set = {content_ids[index] for index in content_middle}
+    base_indexes = [index for index in base_middle if base_ids[index] in content_set]
+    content_indexes = [index for index in content_middle if content_ids[index] in base_set]
+    base_seq = [base_ids[index] for index in base_indexes]
+    content_seq = [content_ids[index] for index in content_indexes]
+
+    middle_matches = []
+    _myers_matches(base_seq, content_seq, middle_matches)
+    middle_matches.sort()
+    matches.extend((base_indexes[x], content_indexes[y]) for x, y in middle_matches)
+
+    base_offset = base_len - suffix_len
+    content_offset = content_len - suffix_len
+    matches.extend((base_offset + index, content_offset + index) for index in range(0, suffix_len))
+    return matches
+
+
+## calculate matching blocks (base start, content start, size) of sequences
+## identical runs are skipped by comparing slices, after mismatch sequences are synchronized on first
+## line unique in both lookahead windows (window grows until anchor is found)
+## exact diff is calculated only for lines between mismatch and anchor
+def calculate_windowed_blocks(base_lines, content_lines, window_size=8):
+    blocks = []
+    base_len = len(base_lines)
+    content_len = len(content_lines)
+    a_pos = 0
+    b_pos = 0
+    while a_pos < base_len and b_pos < content_len:
+        run_len = get_identical_run(base_lines, a_pos, content_lines, b_pos)
+        if run_len > 0:
+            blocks.append((a_pos, b_pos, run_len))
+            a_pos += run_len
+            b_pos += run_len
+            continue
+
+        a_next = a_pos + 1
+        b_next = b_pos + 1
+        base_following = base_lines[a_next : a_next + 2]
+        content_following = content_lines[b_next : b_next + 2]
+        same_following = base_following == content_following
+        if same_following and base_lines[a_pos] not in content_following and content_lines[b_pos] not in base_following:
+            ## single line replaced and followed by matching lines - most common change of formatter
+            a_pos = a_next
+            b_pos = b_next
+            continue
+
+        ## mismatch - find next anchor
+        window = window_size
+        while True:
+            a_end = min(base_len, a_pos + window)
+            b_end = min(content_len, b_pos + window)
+            anchors = find_unique_anchors(base_lines, a_pos, a_end, content_lines, b_pos, b_end)
+            if anchors:
+                a_end, b_end = anchors[0]
+                break
+            if a_end == base_len and b_end == content_len:
+                break
+            window *= 2
+
+        window_matches = calculate_myers_matches(*intern_lines(base_lines[a_pos:a_end], content_lines[b_pos:b_end]))
+        blocks.extend((a_pos + x_pos, b_pos + y_pos, 1) for x_pos, y_pos in window_matches)
+        a_pos = a_end
+        b_pos = b_end
+    return blocks
+
+
+## length of identical run starting at given positions, slices of growing size are compared
+def get_identical_run(base_lines, a_pos, content_lines, b_pos):
+    max_len = min(len(base_lines) - a_pos, len(content_lines) - b_pos)
+    run_len = 0
+    step = 8
+    while run_len < max_len:
+        step = min(step, max_len - run_len)
+        a_start = a_pos + run_len
+        b_start = b_pos + run_len
+        if base_lines[a_start : a_start + step] == content_lines[b_start : b_start + step]:
+            run_len += step
+            step *= 2
+        elif step > 1:
+            step //= 2
+        else:
+            break
+    return run_len
+
+
+## find lines occurring exactly once in both windows and select longest chain of them
+## appearing in the same order in both sequences (patience sorting)
+def find_unique_anchors(base_lines, a_lo, a_hi, content_lines, b_lo, b_hi):
+    ## line -> index of occurrence or -1 if line is not unique
+    base_unique = {}
+    for index in range(a_lo, a_hi):
+        line = base_lines[index]
+        base_unique[line] = -1 if line in base_unique else index
+    content_unique = {}
+    for index in range(b_lo, b_hi):
+        line = content_lines[index]
+        if line in base_unique:
+            content_unique[line] = -1 if line in content_unique else index
+
+    candidates = []
+    for index in range(a_lo, a_hi):
+        line = base_lines[index]
+        if base_unique[line] < 0:
+            continue
+        content_index = content_unique.get(line, -1)
+        if content_index < 0:
+            continue
+        candidates.append((index, content_index))
+
+    ## longest increasing subsequence of content indexes
+    piles_tops: List[int] = []
+    piles_items: List[int] = []
+    prev_item: List[int] = []
+    for item_index, (_, content_index) in enumerate(candidates):
+        pile_index = bisect.bisect_left(piles_tops, content_index)
+        if pile_index == len(piles_tops):
+            piles_tops.append(content_index)
+            piles_items.append(item_index)
+        else:
+            piles_tops[pile_index] = content_index
+            piles_items[pile_index] = item_index
+        prev_item.append(piles_items[pile_index - 1] if pile_index > 0 else -1)
+
+    anchors = []
+    item_index = piles_items[-1] if piles_items else -1
+    while item_index >= 0:
+        anchors.append(candidates[item_index])
+        item_index = prev_item[item_index]
+    anchors.reverse()
+    return anchors
+
+
+## divide and conquer over middle snakes, matches are appended in arbitrary order
+def _myers_matches(base_seq, content_seq, out_matches):
+    ranges_stack = [(0, len(base_seq), 0, len(content_seq))]
+    while ranges_stack:
+        a_lo, a_hi, b_lo, b_hi = ranges_stack.pop()
+        ## shrink by common prefix and suffix
+        while a_lo < a_hi and b_lo < b_hi and base_seq[a_lo] == content_seq[b_lo]:
+            out_matches.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and base_seq[a_hi - 1] == content_seq[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            out_matches.append((a_hi, b_hi))
+        if a_lo >= a_hi or b_lo >= b_hi:
+            continue
+
+        distance, x_start, y_start, x_end, y_end = _find_middle_snake(base_seq, a_lo, a_hi, content_seq, b_lo, b_hi)
+        if distance <= 1:
+            ## sequences differ by single line - greedy matching is optimal
+            x_pos, y_pos = a_lo, b_lo
+            while x_pos < a_hi and y_pos < b_hi:
+                if base_seq[x_pos] == content_seq[y_pos]:
+                    out_matches.append((x_pos, y_pos))
+                    x_pos += 1
+                    y_pos += 1
+                elif a_hi - a_lo > b_hi - b_lo:
+                    x_pos += 1
+                else:
+                    y_pos += 1
+            continue
+
+        for offset in range(0, x_end - x_start):
+            out_matches.append((x_start + offset, y_start + offset))
+        ranges_stack.append((a_lo, x_start, b_lo, y_start))
+        ranges_stack.append((x_end, a_hi, y_end, b_hi))
+
+
+## find middle snake of edit graph of given subsequences
+## returns tuple (edit distance, snake start x, snake start y, snake end x, snake end y)
+def _find_middle_snake(base_seq, a_lo, a_hi, content_seq, b_lo, b_hi):
+    # pylint: disable=R0914
+    n_len = a_hi - a_lo
+    m_len = b_hi - b_lo
+    delta = n_len - m_len
+    odd_delta = delta & 1
+    max_d = (n_len + m_len + 1) // 2
+    offset = max_d + 1
+    ## furthest reaching x on each diagonal, forward and backward (from the end)
+    forward_v = [0] * (2 * max_d + 3)
+    backward_v = [0] * (2 * max_d + 3)
+    for d_step in range(0, max_d + 1):
+        for k_diag in range(-d_step, d_step + 1, 2):
+            k_index = offset + k_diag
+            if k_diag == -d_step or (k_diag != d_step and forward_v[k_index - 1] < forward_v[k_index + 1]):
+                x_pos = forward_v[k_index + 1]
+            else:
+                x_pos = forward_v[k_index - 1] + 1
+            y_pos = x_pos - k_diag
+            x_start, y_start = x_pos, y_pos
+            while x_pos < n_len and y_pos < m_len and base_seq[a_lo + x_pos] == content_seq[b_lo + y_pos]:
+                x_pos += 1
+                y_pos += 1
+            forward_v[k_index] = x_pos
+            c_diag = delta - k_diag
+            if odd_delta and -(d_step - 1) <= c_diag <= d_step - 1:
+                if x_pos + backward_v[offset + c_diag] >= n_len:
+                    return (2 * d_step - 1, a_lo + x_start, b_lo + y_start, a_lo + x_pos, b_lo + y_pos)
+
+        for c_diag in range(-d_step, d_step + 1, 2):
+            c_index = offset + c_diag
+            if c_diag == -d_step or (c_diag != d_step and backward_v[c_index - 1] < backward_v[c_index + 1]):
+                x_pos = backward_v[c_index + 1]
+            else:
+                x_pos = backward_v[c_index - 1] + 1
+            y_pos = x_pos - c_diag
+            x_end, y_end = x_pos, y_pos
+            while x_pos < n_len and y_pos < m_len and base_seq[a_hi - 1 - x_pos] == content_seq[b_hi - 1 - y_pos]:
+                x_pos += 1
+                y_pos += 1
+            backward_v[c_index] = x_pos
+            k_diag = delta - c_diag
+            if not odd_delta and -d_step <= k_diag <= d_step:
+                if x_pos + forward_v[offset + k_diag] >= n_len:
+                    return (2 * d_step, a_hi - x_pos, b_hi - y_pos, a_hi - x_end, b_hi - y_end)
+
+    raise RuntimeError("middle snake not found")
+
+
+## convert sorted list of matching pairs to opcodes
+def matches_to_opcodes(matches, base_len, content_len):
+    opcodes = []
+    x_pos = 0
+    y_pos = 0
+    for x_match, y_match in matches + [(base_len, content_len)]:
+        if x_match > x_pos or y_match > y_pos:
+            if x_match == x_pos:
+                tag = "insert"
+            elif y_match == y_pos:
+                tag = "delete"
+            else:
+                tag = "replace"
+            opcodes.append((tag, x_pos, x_match, y_pos, y_match))
+        x_pos = x_match + 1
+        y_pos = y_match + 1
+    return opcodes
+
+
+## convert sorted list of matching blocks (base start, content start, size) to opcodes
+def blocks_to_opcodes(blocks, base_len, content_len):
+    opcodes = []
+    x_pos = 0
+    y_pos = 0
+    for x_block, y_block, block_size in blocks + [(base_len, content_len, 0)]:
+        if x_block > x_pos or y_block > y_pos:
+            if x_block == x_pos:
+                tag = "insert"
+            elif y_block == y_pos:
+                tag = "delete"
+            else:
+                tag = "replace"
+            opcodes.append((tag, x_pos, x_block, y_pos, y_block))
+        x_pos = x_block + block_size
+        y_pos = y_block + block_size
+    return opcodes
+
+
+## format opcodes in the same way as 'difflib.unified_diff(n=0, lineterm="")' does
+def format_unified_diff(opcodes, base_lines, content_lines) -> Iterator[str]:
+    bytes_lines = is_bytes_lines(base_lines, content_lines)
+    removed_marker = b"-" if bytes_lines else "-"
+    added_marker = b"+" if bytes_lines else "+"
+    started = False
+    for tag, i_start, i_end, j_start, j_end in opcodes:
+        if tag == "equal":
+            continue
+        if not started:
+            started = True
+            yield b"--- " if bytes_lines else "--- "
+            yield b"+++ " if bytes_lines else "+++ "
+        base_range = _format_range(i_start, i_end)
+        content_range = _format_range(j_start, j_end)
+        hunk_header = f"@@ -{base_range} +{content_range} @@"
+        yield hunk_header.encode("ascii") if bytes_lines else hunk_header
+        for line_index in range(i_start, i_end):
+            yield removed_marker + base_lines[line_index]
+        for line_index in range(j_start, j_end):
+            yield added_marker + content_lines[line_index]
+
+
+def _format_range(start, stop):
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
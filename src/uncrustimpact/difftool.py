@@ -15,15 +15,17 @@ from multiprocessing import Pool
 
 from uncrustimpact.filediff import Changes
 from uncrustimpact.filediff import UnifiedDiffChanges
-from uncrustimpact.cfgparser import read_params_space
 from uncrustimpact.printhtml import print_to_html, print_impact_page
 from uncrustimpact.impacttool import (
     labels_to_links,
     name_to_diff_filename,
-    execute_uncrustify,
+    split_to_batches,
     convert_path,
     get_common_prefix_len,
 )
+from uncrustimpact.runner import write_data
+from uncrustimpact.sourcefile import get_source_file
+from uncrustimpact.resultcache import create_result_cache, format_file, format_files_batch
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,30 +33,62 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 _LOGGER = logging.getLogger(__name__)
 
 
-def calculate_diff(input_base_file_set, base_config_path, output_base_dir_path):
+def calculate_diff(
+    input_base_file_set,
+    base_config_path,
+    output_base_dir_path,
+    batch_size=1,
+    cache_dir=None,
+    cache_size=None,
+    diff_engine=None,
+    fallback_encoding=None,
+):
     os.makedirs(output_base_dir_path, exist_ok=True)
+    results_cache = create_result_cache(cache_dir, cache_size, diff_engine)
 
     path_prefix_len = get_common_prefix_len(input_base_file_set)
 
+    files_data = []
+    for file_path in input_base_file_set:
+        file_rel_path = file_path[path_prefix_len:]
+        file_dir_name = convert_path(file_rel_path)
+        file_dir_path = os.path.join(output_base_dir_path, file_dir_name)
+        files_data.append((file_path, file_dir_path))
+
     files_stats = {}
     with Pool() as process_pool:
         result_queue = []
 
-        for file_path in input_base_file_set:
-            file_rel_path = file_path[path_prefix_len:]
-            file_dir_name = convert_path(file_rel_path)
-            file_dir_path = os.path.join(output_base_dir_path, file_dir_name)
-
-            # execute uncrustify in separate thread
-            async_result = process_pool.apply_async(calculate_diff_file, [file_path, base_config_path, file_dir_path])
-            result_queue.append((file_rel_path, async_result))
+        for batch_data in split_to_batches(files_data, batch_size):
+            if len(batch_data) > 1:
+                # format whole batch by single uncrustify execution
+                async_result = process_pool.apply_async(
+                    calculate_diff_batch,
+                    [batch_data, base_config_path, output_base_dir_path, results_cache, diff_engine, fallback_encoding],
+                )
+            else:
+                # execute uncrustify in separate thread
+                file_path, file_dir_path = batch_data[0]
+                async_result = process_pool.apply_async(
+                    calculate_diff_file,
+                    [file_path, base_config_path, file_dir_path, results_cache, diff_engine, fallback_encoding],
+                )
+            result_queue.append((batch_data, async_result))
 
         # wait for results
-        for file_rel_path, async_result in result_queue:
-            file_index_path, changes_num = async_result.get()
-            if file_index_path is None or changes_num is None:
-                continue
-            files_stats[file_rel_path] = (file_index_path, changes_num)
+        for batch_data, async_result in result_queue:
+            batch_results = async_result.get()
+            if len(batch_data) <= 1:
+                batch_results = [batch_results]
+            for file_data, file_result in zip(batch_data, batch_results):
+                file_index_path, changes_num = file_result
+                if file_index_path is None or changes_num is None:
+                    continue
+                file_rel_path = file_data[0][path_prefix_len:]
+                files_stats[file_rel_path] = (file_index_path, changes_num)
+
+    if results_cache is not None:
+        results_cache.trim()
 
     files_stats = dict(sorted(files_stats.items(), key=lambda item: (-item[1][1], item[0])))
 
@@ -63,50 +97,66 @@ def calculate_diff(input_base_file_set, base_config_path, output_base_dir_path):
     print_impact_page(files_stats, out_path)
 
 
-def calculate_diff_file(input_base_file_path, base_config_path, output_base_dir_path):
+## calculate diff of batch of files formatted by single uncrustify execution
+def calculate_diff_batch(
+    files_data, base_config_path, output_base_dir_path, results_cache=None, diff_engine=None, fallback_encoding=None
+):
+    input_files_list = [item[0] for item in files_data]
+    batch_results = format_files_batch(
+        input_files_list, base_config_path, output_base_dir_path, results_cache, diff_engine
+    )
+    ret_list = []
+    for input_base_file_path, file_dir_path in files_data:
+        _LOGGER.info("handling file %s", input_base_file_path)
+        item_data, raw_diff = batch_results[input_base_file_path]
+        file_result = calculate_diff_output(input_base_file_path, item_data, raw_diff, file_dir_path, fallback_encoding)
+        ret_list.append(file_result)
+    return ret_list
+
+
+def calculate_diff_file(
+    input_base_file_path,
+    base_config_path,
+    output_base_dir_path,
+    results_cache=None,
+    diff_engine=None,
+    fallback_encoding=None,
+):
     _LOGGER.info("handling file %s", input_base_file_path)
+    item_data, raw_diff = format_file(input_base_file_path, base_config_path, results_cache, diff_engine=diff_engine)
+    return calculate_diff_output(input_base_file_path, item_data, raw_diff, output_base_dir_path, fallback_encoding)
+
 
+def calculate_diff_output(input_base_file_path, item_data, raw_diff, output_base_dir_path, fallback_encoding=None):
     input_filename = os.path.basename(input_base_file_path)
     out_file_path = os.path.join(output_base_dir_path, input_filename)
 
-    with open(input_base_file_path, encoding="utf-8") as file_1:
-        filebase_text = file_1.readlines()
+    input_source = get_source_file(input_base_file_path)
 
-    params_base_cfg_dict = read_params_space(base_config_path)
-    # pprint.pprint(params_base_cfg_dict)
-    ## convert to standard config dict
-    params_base_cfg_dict = {key: subdict["value"] for key, subdict in params_base_cfg_dict.items()}
+    changes = UnifiedDiffChanges("base", input_source)
 
-    changes = UnifiedDiffChanges("base", filebase_text)
-
-    execute_uncrustify(input_base_file_path, base_config_path, out_file_path)
-
-    with open(out_file_path, encoding="utf-8") as item_file:
-        item_text = item_file.readlines()
-    raw_diff = changes.calculate_diff(item_text)
     changed = changes.parse_diff(None, raw_diff)
 
     if not changed:
-        # remove unused files
-        os.remove(out_file_path)
         return None, None
 
-    # write files diff to file
-    raw_diff = "".join(raw_diff)
+    # write output and files diff to file
+    os.makedirs(output_base_dir_path, exist_ok=True)
+    write_data(out_file_path, item_data)
     diff_filename = name_to_diff_filename(input_filename)
     out_diff_path = os.path.join(output_base_dir_path, diff_filename)
-    with open(out_diff_path, "w", encoding="utf-8") as out_file:
-        out_file.write(raw_diff)
+    with open(out_diff_path, "wb") as out_file:
+        out_file.writelines(raw_diff)
 
     out_path = os.path.join(output_base_dir_path, "index.html")
-    print_diff_page(changes, out_path, input_filename)
+    print_diff_page(changes, out_path, input_filename, fallback_encoding)
 
     _LOGGER.info("output stored to: file://%s", out_path)
     total_changes = changes.count_changed_lines()
     return out_path, total_changes
 
 
-def print_diff_page(changes: Changes, out_path, input_filename=None):
+def print_diff_page(changes: Changes, out_path, input_filename=None, fallback_encoding=None):
     top_content = None
     if input_filename is not None:
         top_content = f"""\
@@ -120,7 +170,11 @@ def print_diff_page(changes: Changes, out_path, input_filename=None):
 
     # write general diff
     content = print_to_html(
-        changes, label_converter=labels_to_links, top_content=top_content, bottom_content=bottom_content
+        changes,
+        label_converter=labels_to_links,
+        top_content=top_content,
+        bottom_content=bottom_content,
+        fallback_encoding=fallback_encoding,
     )
     with open(out_path, "w", encoding="utf-8") as out_file:
         out_file.write(content)
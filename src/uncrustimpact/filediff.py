@@ -7,12 +7,25 @@
 #
 
 import os
+from array import array
 from enum import Enum, unique, auto
 from dataclasses import dataclass
 from typing import List, Any, Dict
 
 import difflib
 import pprint
+import itertools
+
+from uncrustimpact.diffengine import get_diff_engine
+from uncrustimpact.sourcefile import SourceFile
+from uncrustimpact.changematrix import (
+    ChangeMatrix,
+    create_change_matrix,
+    STATE_CHANGED,
+    STATE_ADDED,
+    STATE_REMOVED,
+    STATE_MODIFIED,
+)
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -26,8 +39,19 @@ class LineModifier(Enum):
     REMOVED = auto()
 
 
+## codes of modifiers stored in change matrix
+MODIFIER_CODES = {
+    LineModifier.SAME: 0,
+    LineModifier.CHANGED: STATE_CHANGED,
+    LineModifier.ADDED: STATE_ADDED,
+    LineModifier.REMOVED: STATE_REMOVED,
+}
+
+
 @dataclass
 class LineState:
+    __slots__ = ("label_name", "state")
+
     label_name: str
     state: LineModifier
 
@@ -44,69 +68,112 @@ class LineState:
         return self.state in (LineModifier.CHANGED, LineModifier.REMOVED)
 
 
+## modifiers indexed by code stored in packed state
+MODIFIERS_LIST = list(LineModifier)
+MODIFIERS_INDEX = {modifier: index for index, modifier in enumerate(MODIFIERS_LIST)}
+
+
+## state is packed to single integer: bits 0-2 - modifier index, bits 3-31 - label id,
+## bits 32-63 - parse id increased by 1 (0 means None)
+def pack_state(label_id, modifier: LineModifier, parse_id=None) -> int:
+    parse_code = 0 if parse_id is None else parse_id + 1
+    return (parse_code << 32) | (label_id << 3) | MODIFIERS_INDEX[modifier]
+
+
+## returns tuple (label id, modifier, parse id)
+def unpack_state(packed_state):
+    parse_code = packed_state >> 32
+    parse_id = None if parse_code == 0 else parse_code - 1
+    return ((packed_state >> 3) & 0x1FFFFFFF, MODIFIERS_LIST[packed_state & 7], parse_id)
+
+
+## states of line stored compactly as packed integers in array
+## labels are interned by change matrix of file ('matrix'), shared by all lines of the file
 class LineModifiers:
-    def __init__(self):
-        self.modifiers: List[LineState] = []
+    __slots__ = ("matrix", "states", "not_same_ids")
+
+    def __init__(self, matrix: ChangeMatrix = None):
+        if matrix is None:
+            matrix = create_change_matrix(0)
+        self.matrix = matrix
+        self.states = array("q")
+        ## indexes of diffs that do not imply SAME state of the line
+        self.not_same_ids = array("l")
+
+    ## list of states (created on demand)
+    @property
+    def modifiers(self) -> List[LineState]:
+        return [LineState(label, modifier) for label, modifier, _ in self.iterate_states()]
+
+    ## index of diff (in FileState) that introduced state, None if SAME states are not implied
+    @property
+    def parse_ids(self) -> List[int]:
+        return [parse_id for _, _, parse_id in self.iterate_states()]
+
+    ## yields tuples (label, modifier, parse id)
+    def iterate_states(self):
+        labels = self.matrix.labels
+        for packed_state in self.states:
+            label_id, modifier, parse_id = unpack_state(packed_state)
+            yield (labels[label_id], modifier, parse_id)
 
     def is_empty(self) -> bool:
-        return not self.modifiers
+        return not self.states
 
     def has_modifier(self, modifier: LineModifier):
-        for item in self.modifiers:
-            if item.is_modifier(modifier):
+        modifier_index = MODIFIERS_INDEX[modifier]
+        for packed_state in self.states:
+            if packed_state & 7 == modifier_index:
                 return True
         return False
 
     def has_same(self):
-        for item in self.modifiers:
-            if item.is_same():
-                return True
-        return False
+        return self.has_modifier(LineModifier.SAME)
 
     def has_added(self):
-        for item in self.modifiers:
-            if item.is_added():
-                return True
-        return False
+        return self.has_modifier(LineModifier.ADDED)
 
     def has_modified(self):
-        for item in self.modifiers:
-            if item.is_modified():
-                return True
-        return False
+        return self.has_modifier(LineModifier.CHANGED) or self.has_modifier(LineModifier.REMOVED)
 
     def count_changes(self, label=None):
+        same_index = MODIFIERS_INDEX[LineModifier.SAME]
+        label_id = None
+        if label is not None:
+            label_id = self.matrix.label_ids.get(label)
+            if label_id is None:
+                return 0
         state_set = set()
-        for item in self.modifiers:
-            if label is not None:
-                if item.label_name != label:
-                    continue
-            if item.state == LineModifier.SAME:
+        for packed_state in self.states:
+            if label_id is not None and (packed_state >> 3) & 0x1FFFFFFF != label_id:
                 continue
-            state_set.add(item.state)
+            modifier_index = packed_state & 7
+            if modifier_index == same_index:
+                continue
+            state_set.add(modifier_index)
         return len(state_set)
 
     def get_modifier_files(self, modifier: LineModifier) -> List[str]:
         ret_list = []
-        for item in self.modifiers:
-            if item.is_modifier(modifier):
-                ret_list.append(item.label_name)
+        for label, item_modifier, _ in self.iterate_states():
+            if item_modifier == modifier:
+                ret_list.append(label)
         return ret_list
 
     def get_modified_files(self) -> List[str]:
         ret_list = []
-        for item in self.modifiers:
-            if item.is_modified():
-                ret_list.append(item.label_name)
+        for label, item_modifier, _ in self.iterate_states():
+            if item_modifier in (LineModifier.CHANGED, LineModifier.REMOVED):
+                ret_list.append(label)
         return ret_list
 
-    def add_state(self, label, modifier: LineModifier):
-        self.modifiers.append(LineState(label, modifier))
+    def add_state(self, label, modifier: LineModifier, parse_id=None):
+        self.states.append(pack_state(self.matrix.get_label_id(label), modifier, parse_id))
 
     def to_list_raw(self):
         ret_list = []
-        for item in self.modifiers:
-            ret_list.append((item.label_name, item.state.name))
+        for label, modifier, _ in self.iterate_states():
+            ret_list.append((label, modifier.name))
         return ret_list
 
     def to_str(self):
@@ -176,59 +243,134 @@ class ModifyStream:
 
 class FileState:
     def __init__(self, length):
-        self.before: LineModifiers = LineModifiers()
-        self.line_state: List[LineModifiers] = []
-        for _ in range(0, length):
-            self.line_state.append(LineModifiers())
+        self.length = length
+        ## modifiers of lines and labels - source of counters and per line labels
+        ## interns labels of states of all lines
+        self.matrix: ChangeMatrix = create_change_matrix(length)
+        self.before: LineModifiers = LineModifiers(self.matrix)
+        ## sparse storage - only lines having any state
+        self.line_state: Dict[int, LineModifiers] = {}
+        ## labels of diffs with implied SAME states - in order of parsing
+        ## line is SAME for such diff unless the diff is listed in line's 'not_same_ids'
+        self.implied_labels: List[str] = []
         self._modify_stream = ModifyStream()
         self._line_counter = -1
+        self._parse_id = None
+        self._same_end = 1
 
     def count_changed_lines(self):
-        counted = 0
-        if self.before.count_changes() > 0:
-            counted += 1
-        for item in self.line_state:
-            if item.count_changes() > 0:
-                counted += 1
-        return counted
+        return self.matrix.count_changed_lines()
 
     def count_changes(self, label=None):
-        counted = self.before.count_changes(label)
-        for item in self.line_state:
-            counted += item.count_changes(label)
-        return counted
+        return self.matrix.count_changes(label)
+
+    def has_unchanged(self):
+        return len(self.implied_labels) > 0
+
+    ## register label that does not change file - O(1) instead of adding SAME state to each line
+    def add_unchanged(self, label_name):
+        self.implied_labels.append(label_name)
+
+    ## check if line has SAME state (explicit or implied)
+    def has_same(self, line_index) -> bool:
+        if line_index < 0:
+            return self.before.has_same()
+        item = self.line_state.get(line_index)
+        if item is None:
+            return len(self.implied_labels) > 0
+        if item.has_same():
+            return True
+        return len(item.not_same_ids) < len(self.implied_labels)
 
     def to_dict_raw(self):
         ret_dict = {}
         ret_dict[-1] = self.before.to_list_raw()
-        for index, item in enumerate(self.line_state):
-            ret_dict[index] = item.to_list_raw()
+        for index in range(0, self.length):
+            ret_dict[index] = self._get_line_list_raw(index)
         return ret_dict
 
     def to_dict_modifiers(self) -> Dict[int, LineModifiers]:
         ret_dict = {}
         ret_dict[-1] = self.before
-        for index, item in enumerate(self.line_state):
-            ret_dict[index] = item
+        empty_item = LineModifiers(self.matrix)
+        for index in range(0, self.length):
+            ret_dict[index] = self.line_state.get(index, empty_item)
         return ret_dict
 
+    def get_line_modifiers(self, line_index) -> LineModifiers:
+        if line_index < 0:
+            return self.before
+        item = self.line_state.get(line_index)
+        if item is None:
+            return LineModifiers(self.matrix)
+        return item
+
     def parse_diff(self, label_name, diff_list) -> bool:
         raise NotImplementedError("not implemented")
 
+    def _store_state(self, line_number, label, modifier: LineModifier, parse_id=None):
+        line_state: LineModifiers = self._get_modifier_item(line_number)
+        line_state.add_state(label, modifier, parse_id)
+        state_code = MODIFIER_CODES[modifier]
+        if state_code:
+            self.matrix.add_state(line_number - 1, label, state_code)
+
     def _get_modifier_item(self, line_number) -> LineModifiers:
         if line_number == 0:
             return self.before
-        return self.line_state[line_number - 1]
+        line_index = line_number - 1
+        if line_index < 0 or line_index >= self.length:
+            raise IndexError(f"line out of range: {line_number}")
+        item = self.line_state.get(line_index)
+        if item is None:
+            item = LineModifiers(self.matrix)
+            self.line_state[line_index] = item
+        return item
+
+    ## states of line with implied SAME states restored
+    def _get_line_list_raw(self, line_index):
+        item = self.line_state.get(line_index)
+        if item is None:
+            return [(label, LineModifier.SAME.name) for label in self.implied_labels]
+        if not self.implied_labels:
+            return item.to_list_raw()
+
+        parse_states: Dict[int, List[Any]] = {}
+        ret_list = []
+        for label, modifier, parse_id in item.iterate_states():
+            if parse_id is None:
+                ret_list.append((label, modifier.name))
+                continue
+            parse_states.setdefault(parse_id, []).append((label, modifier.name))
+        not_same_set = set(item.not_same_ids)
+        for parse_id, label in enumerate(self.implied_labels):
+            if parse_id not in not_same_set:
+                ret_list.append((label, LineModifier.SAME.name))
+            ret_list.extend(parse_states.get(parse_id, []))
+        return ret_list
 
 
+## 'base_lines' is list of lines or 'SourceFile' (then lines are given as views of mapped file)
 class Changes:
     def __init__(self, file_name, base_lines):
         self.base_file_name = file_name
-        self.base_lines = base_lines
+        self.source_file: SourceFile = None
+        if isinstance(base_lines, SourceFile):
+            self.source_file = base_lines
+            base_lines = None
+        self._base_lines = base_lines
         self.file_state: FileState = None
 
+    @property
+    def base_lines(self):
+        if self._base_lines is None and self.source_file is not None:
+            return self.source_file.lines
+        return self._base_lines
+
     def get_content_line(self, line_index):
-        return self.base_lines[line_index]
+        if self.source_file is not None:
+            return self.source_file.get_line_view(line_index)
+        return self._base_lines[line_index]
 
     def count_changed_lines(self):
         return self.file_state.count_changed_lines()
@@ -246,13 +388,13 @@ class Changes:
         return self.file_state.to_dict_raw()
 
     def to_list_raw(self, removed_as_changed=False, do_not_repeat=True):
-        changes_dict = self.to_dict_modifiers()
+        file_state = self.file_state
 
         ret_list = []
 
-        # item: LineModifiers
-        for index, item in changes_dict.items():
-            if item.is_empty():
+        for index in range(-1, file_state.length):
+            has_same = file_state.has_same(index)
+            if not has_same and not file_state.matrix.get_line_state(index):
                 continue
 
             line_content = self.get_content_line(index)
@@ -260,40 +402,24 @@ class Changes:
             appended = False
 
             if removed_as_changed is False:
-                changed_files = item.get_modifier_files(LineModifier.CHANGED)
+                changed_files = self._get_line_labels(index, LineModifier.CHANGED, do_not_repeat)
                 if changed_files:
-                    if do_not_repeat:
-                        changed_files = set(changed_files)
-                        changed_files = list(changed_files)
-                    changed_files.sort()
                     ret_list.append((index + 1, line_content, LineModifier.CHANGED, changed_files))
                     appended = True
 
-                removed_files = item.get_modifier_files(LineModifier.REMOVED)
+                removed_files = self._get_line_labels(index, LineModifier.REMOVED, do_not_repeat)
                 if removed_files:
-                    if do_not_repeat:
-                        removed_files = set(removed_files)
-                        removed_files = list(removed_files)
-                    removed_files.sort()
                     ret_list.append((index + 1, line_content, LineModifier.REMOVED, removed_files))
                     appended = True
             else:
-                modified_files = item.get_modified_files()
+                modified_files = self._get_line_labels(index, None, do_not_repeat)
                 if modified_files:
-                    if do_not_repeat:
-                        modified_files = set(modified_files)
-                        modified_files = list(modified_files)
-                    modified_files.sort()
                     ret_list.append((index + 1, line_content, LineModifier.CHANGED, modified_files))
                     appended = True
 
-            added_files = item.get_modifier_files(LineModifier.ADDED)
+            added_files = self._get_line_labels(index, LineModifier.ADDED, do_not_repeat)
             if added_files:
-                if do_not_repeat:
-                    added_files = set(added_files)
-                    added_files = list(added_files)
-                added_files.sort()
-                if item.has_modifier(LineModifier.SAME):
+                if has_same:
                     if not ret_list or ret_list[-1][0] != index + 1:
                         # add "same" if there is no modification of the same line
                         ret_list.append((index + 1, line_content, LineModifier.SAME, None))
@@ -303,14 +429,31 @@ class Changes:
             if appended:
                 continue
 
-            if item.has_modifier(LineModifier.SAME):
+            if has_same:
                 ret_list.append((index + 1, line_content, LineModifier.SAME, None))
                 continue
 
-            raise RuntimeError(f"invalid state - unhandled case: {index}: {item.to_str()}")
+            raise RuntimeError(f"invalid state - unhandled case: {index}")
 
         return ret_list
 
+    ## sorted labels of given modifier in line, 'None' modifier means changed or removed
+    def _get_line_labels(self, line_index, modifier: LineModifier, do_not_repeat):
+        if do_not_repeat:
+            if modifier is None:
+                state_mask = STATE_MODIFIED
+            else:
+                state_mask = MODIFIER_CODES[modifier]
+            labels_list = self.file_state.matrix.get_line_labels(line_index, state_mask)
+        else:
+            item: LineModifiers = self.file_state.get_line_modifiers(line_index)
+            if modifier is None:
+                labels_list = item.get_modified_files()
+            else:
+                labels_list = item.get_modifier_files(modifier)
+        labels_list.sort()
+        return labels_list
+
     def to_dict_modifiers(self) -> Dict[int, LineModifiers]:
         return self.file_state.to_dict_modifiers()
 
@@ -366,7 +509,7 @@ class NDiffFileState(FileState):
         modify_list = self._modify_stream.flush()
         self._process_modify(label, modify_list)
 
-        state_len = len(self.line_state)
+        state_len = self.length
         self._line_counter += 1
         for index in range(self._line_counter, state_len + 1):
             self._line_counter = index
@@ -374,8 +517,7 @@ class NDiffFileState(FileState):
 
     def _add_state(self, label, modifier):
         if self._line_counter == 0 and modifier == LineModifier.ADDED:
-            line_state: LineModifiers = self._get_modifier_item(self._line_counter)
-            line_state.add_state(label, modifier)
+            self._store_state(self._line_counter, label, modifier)
             return
 
         modify_list = self._modify_stream.add(self._line_counter, modifier)
@@ -385,8 +527,7 @@ class NDiffFileState(FileState):
         for item in modify_list:
             item_line = item[0]
             item_modify = item[1]
-            line_state: LineModifiers = self._get_modifier_item(item_line)
-            line_state.add_state(label, item_modify)
+            self._store_state(item_line, label, item_modify)
             self._line_counter = item_line
 
 
@@ -440,86 +581,83 @@ class UnifiedDiffFileState(FileState):
 
         # print("aaaaa:", diff_list)
 
+        ## diff can be any iterable (e.g. generator) - hunks are parsed as they come
+        hunks_iter = parse_hunks(diff_list)
+        first_hunk = next(hunks_iter, None)
+        if first_hunk is None:
+            # content is the same
+            self.add_unchanged(label_name)
+            return False
+
         changed = False
         self._line_counter = 0
-        diff_list = diff_list[2:]  # ignore first two items - they contain filenames only
-        for line in diff_list:
-            if line.startswith("@@"):
-                # change header
-                line_data = line.strip("@")
-                line_data = line_data.strip()
-                changes = line_data.split(" ")
-                from_start, from_changes = self._parse_change_numbers(changes[0])
-                _to_start, to_changes = self._parse_change_numbers(changes[1])
-
-                if from_changes == 0:
-                    # added
-                    self._line_counter += 1
-                    self._fill_same(label_name, from_start + 1)
-                    self._line_counter = from_start
-                    self._add_state(label_name, LineModifier.ADDED)
-                elif from_changes == to_changes:
-                    # modified
-                    self._line_counter += 1
-                    self._fill_same(label_name, from_start)
-                    self._line_counter = from_start
-                    change_end = from_start + from_changes
-                    self._fill(label_name, change_end, LineModifier.CHANGED)
-                elif from_changes > to_changes:
-                    # removed
-                    self._line_counter += 1
-                    self._fill_same(label_name, from_start)
-                    self._line_counter += 1
-                    change_end = from_start + to_changes
-                    self._fill(label_name, change_end, LineModifier.CHANGED)
-                    self._line_counter = change_end
-                    self._fill(label_name, from_start + from_changes, LineModifier.REMOVED)
-                elif from_changes < to_changes:
-                    # changed, added
-                    self._line_counter += 1
-                    self._fill_same(label_name, from_start)
-                    self._line_counter += 1
-                    change_end = from_start + from_changes
-                    self._fill(label_name, change_end, LineModifier.CHANGED)
-                    self._line_counter = change_end - 1
-                    self._add_state(label_name, LineModifier.ADDED)
-                else:
-                    raise RuntimeError(f"unhandled case: {line}")
-
-                changed = True
-                continue
-
-            if line.startswith("+"):
-                # line added
-                continue
-            if line.startswith("-"):
-                # line removed
-                continue
+        self._parse_id = len(self.implied_labels)
+        self.implied_labels.append(label_name)
+        self._same_end = 1
+        for from_start, from_changes, _to_start, to_changes in itertools.chain([first_hunk], hunks_iter):
+            if from_changes == 0:
+                # added
+                self._line_counter += 1
+                self._fill_same(label_name, from_start + 1)
+                self._line_counter = from_start
+                self._add_state(label_name, LineModifier.ADDED)
+            elif from_changes == to_changes:
+                # modified
+                self._line_counter += 1
+                self._fill_same(label_name, from_start)
+                self._line_counter = from_start
+                change_end = from_start + from_changes
+                self._fill(label_name, change_end, LineModifier.CHANGED)
+            elif from_changes > to_changes:
+                # removed
+                self._line_counter += 1
+                self._fill_same(label_name, from_start)
+                self._line_counter += 1
+                change_end = from_start + to_changes
+                self._fill(label_name, change_end, LineModifier.CHANGED)
+                self._line_counter = change_end
+                self._fill(label_name, from_start + from_changes, LineModifier.REMOVED)
+            elif from_changes < to_changes:
+                # changed, added
+                self._line_counter += 1
+                self._fill_same(label_name, from_start)
+                self._line_counter += 1
+                change_end = from_start + from_changes
+                self._fill(label_name, change_end, LineModifier.CHANGED)
+                self._line_counter = change_end - 1
+                self._add_state(label_name, LineModifier.ADDED)
+            else:
+                raise RuntimeError(f"unhandled case: {from_start} {from_changes} {to_changes}")
 
-            raise RuntimeError(f"unknown marker: {line}")
+            changed = True
         self._end_diff(label_name)
         return changed
 
     def _add_state(self, label, modifier):
         if self._line_counter == 0 and modifier == LineModifier.ADDED:
-            line_state: LineModifiers = self._get_modifier_item(self._line_counter)
-            line_state.add_state(label, modifier)
+            self._store_state(self._line_counter, label, modifier, self._parse_id)
             return
 
         if self._line_counter > 0:
-            line_state: LineModifiers = self._get_modifier_item(self._line_counter)
-            line_state.add_state(label, modifier)
+            self._store_state(self._line_counter, label, modifier, self._parse_id)
             return
 
         raise RuntimeError("invalid state")
 
     def _end_diff(self, label_name):
-        state_len = len(self.line_state)
+        state_len = self.length
         self._line_counter += 1
         self._fill_same(label_name, state_len + 1)
 
-    def _fill_same(self, label_name, end_index):
-        self._fill(label_name, end_index, LineModifier.SAME)
+    def _fill_same(self, _label_name, end_index):
+        ## SAME state is implied - only lines between ranges of SAME are marked
+        same_start = max(self._line_counter, self._same_end)
+        for line_number in range(self._same_end, same_start):
+            line_state: LineModifiers = self._get_modifier_item(line_number)
+            line_state.not_same_ids.append(self._parse_id)
+        self._same_end = max(end_index, same_start)
+        if end_index > self._line_counter:
+            self._line_counter = end_index - 1
 
     def _fill(self, label_name, end_index, modifier):
         for index in range(self._line_counter, end_index):
@@ -527,41 +665,26 @@ class UnifiedDiffFileState(FileState):
             self._add_state(label_name, modifier)
 
     def _parse_change_numbers(self, change_string):
-        from_change = change_string[1:]  # remove minus sign
-        from_change = from_change.split(",")
-        change_start = from_change[0]
-        change_start = int(change_start)
-        change_lines = 1
-        if len(from_change) > 1:
-            change_lines = from_change[1]
-            change_lines = int(change_lines)
-        return (change_start, change_lines)
+        return parse_change_numbers(change_string)
 
 
 class UnifiedDiffChanges(Changes):
-    def __init__(self, file_name, base_lines):
+    def __init__(self, file_name, base_lines, diff_engine=None):
         super().__init__(file_name, base_lines)
         file_length = len(base_lines)
         self.file_state = UnifiedDiffFileState(file_length)
+        self.diff_engine = diff_engine
 
     def add_diff(self, file_name, content_lines):
         ## checks whole file
-        diff_list = self.calculate_diff(content_lines)
-        return self.file_state.parse_diff(file_name, diff_list)
+        diff_iter = self.iterate_diff(content_lines)
+        return self.file_state.parse_diff(file_name, diff_iter)
 
     def parse_diff(self, label_name, diff_list) -> bool:
         return self.file_state.parse_diff(label_name, diff_list)
 
     def print_diff_list(self, diff_list):
-        ret_content = ""
-        ret_content += "".join(diff_list[:2])
-        ret_content += "\n"
-        for line in diff_list[2:]:
-            if line.startswith("@@"):
-                ret_content += line + "\n"
-            else:
-                ret_content += line
-        return ret_content
+        return print_unified_diff_list(diff_list)
 
     def print_diff_raw(self, content_lines):
         diff_list = self.calculate_diff(content_lines)
@@ -577,5 +700,142 @@ class UnifiedDiffChanges(Changes):
             print(data_dict)
 
     def calculate_diff(self, content_lines):
-        diff = difflib.unified_diff(self.base_lines, content_lines, n=0, lineterm="")
-        return list(diff)
+        return calculate_unified_diff(self.base_lines, content_lines, self.diff_engine)
+
+    def iterate_diff(self, content_lines):
+        return iterate_unified_diff(self.base_lines, content_lines, self.diff_engine)
+
+
+## 'diff_engine' is name of engine from 'DIFF_ENGINES' (difflib by default)
+def calculate_unified_diff(base_lines, content_lines, diff_engine=None):
+    engine = get_diff_engine(diff_engine)
+    return engine.calculate_unified_diff(base_lines, content_lines)
+
+
+## generator of diff lines
+def iterate_unified_diff(base_lines, content_lines, diff_engine=None):
+    engine = get_diff_engine(diff_engine)
+    return engine.iterate_unified_diff(base_lines, content_lines)
+
+
+def print_unified_diff_list(diff_list):
+    text_list = list(iterate_unified_diff_text(diff_list))
+    if text_list and isinstance(text_list[0], bytes):
+        return b"".join(text_list)
+    return "".join(text_list)
+
+
+## write diff text incrementally
+def write_unified_diff(out_file, diff_list):
+    out_file.writelines(iterate_unified_diff_text(diff_list))
+
+
+## read diff written by 'write_unified_diff' (in binary mode), returns list of diff items
+## both header items are written in single line, so second header item is empty
+def read_unified_diff(in_file):
+    diff_list = in_file.readlines()
+    if not diff_list:
+        return diff_list
+    return diff_list[:1] + [b""] + diff_list[1:]
+
+
+## generate pieces of diff text (strings or bytes, depending on type of diff items)
+def iterate_unified_diff_text(diff_list):
+    diff_iter = iter(diff_list)
+    header_list = list(itertools.islice(diff_iter, 2))
+    yield from header_list
+    if header_list and isinstance(header_list[0], bytes):
+        hunk_marker = b"@@"
+        new_line = b"\n"
+    else:
+        hunk_marker = "@@"
+        new_line = "\n"
+    yield new_line
+    for line in diff_iter:
+        if line.startswith(hunk_marker):
+            yield line + new_line
+        else:
+            yield line
+
+
+## pass diff lines through writing each of them to file, allows to write and parse diff in single pass
+def write_through(diff_list, out_file):
+    for line in diff_list:
+        out_file.write(line)
+        yield line
+
+
+## iterate over hunks of unified diff calculated without context lines
+## yields tuples (from_start, from_changes, to_start, to_changes)
+def parse_hunks(diff_list):
+    diff_iter = iter(diff_list)
+    # ignore first two items - they contain filenames only
+    first_item = next(diff_iter, None)
+    if first_item is None:
+        return
+    next(diff_iter, None)
+    if isinstance(first_item, bytes):
+        hunk_marker, added_marker, removed_marker = b"@@", b"+", b"-"
+    else:
+        hunk_marker, added_marker, removed_marker = "@@", "+", "-"
+    for line in diff_iter:
+        if line.startswith(hunk_marker):
+            # change header
+            if isinstance(line, bytes):
+                line = line.decode("ascii")
+            line_data = line.strip("@")
+            line_data = line_data.strip()
+            changes = line_data.split(" ")
+            from_start, from_changes = parse_change_numbers(changes[0])
+            to_start, to_changes = parse_change_numbers(changes[1])
+            yield (from_start, from_changes, to_start, to_changes)
+            continue
+        if line.startswith(added_marker):
+            # line added
+            continue
+        if line.startswith(removed_marker):
+            # line removed
+            continue
+        raise RuntimeError(f"unknown marker: {line}")
+
+
+def parse_change_numbers(change_string):
+    from_change = change_string[1:]  # remove minus sign
+    from_change = from_change.split(",")
+    change_start = from_change[0]
+    change_start = int(change_start)
+    change_lines = 1
+    if len(from_change) > 1:
+        change_lines = from_change[1]
+        change_lines = int(change_lines)
+    return (change_start, change_lines)
+
+
+## calculate number of changes of diff directly from hunks headers (without file state)
+## result is equal to 'count_changes()' of UnifiedDiffChanges after parsing the diff
+def count_diff_changes(diff_list):
+    counted = 0
+    line_number = 0  # last handled line
+    for from_start, from_changes, _to_start, to_changes in parse_hunks(diff_list):
+        ## parsing of hunk starting right after last handled line does not mark its first line
+        adjacent = from_start <= line_number + 1
+        if from_changes == 0:
+            # added
+            counted += 1
+            line_number = from_start
+            continue
+        if from_changes == to_changes:
+            # modified
+            counted += from_changes
+        elif from_changes > to_changes:
+            # removed
+            counted += from_changes
+            if adjacent and to_changes > 0:
+                counted -= 1
+        else:
+            # changed, added - last changed line is also marked as added
+            counted += from_changes
+            if not adjacent:
+                counted += 1
+        line_number = from_start + from_changes - 1
+    return counted
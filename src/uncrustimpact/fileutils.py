@@ -0,0 +1,36 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import hashlib
+import tempfile
+
+
+def calculate_hash(content_data):
+    return hashlib.sha256(content_data).hexdigest()
+
+
+def touch_file(file_path):
+    try:
+        os.utime(file_path)
+    except OSError:
+        pass
+
+
+## write to temporary file and rename - concurrent readers never see partial content
+def write_atomic(file_path, content_data):
+    file_dir = os.path.dirname(file_path)
+    os.makedirs(file_dir, exist_ok=True)
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=file_dir)
+    try:
+        with os.fdopen(tmp_fd, "wb") as tmp_file:
+            tmp_file.write(content_data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
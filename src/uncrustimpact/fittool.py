@@ -10,21 +10,11 @@ import os
 import logging
 
 import shutil
+import math
+import random
+from collections import deque
 
-# no threading: 4m 35s
-# threading + none: 3m 40s
-# none + proc: 1m 16sec
-# th + proc: 1m 26sec
-# proc + proc: not allowed
-# proc + th: 4m 40sec
-
-from multiprocessing import Pool as L1Pool
-from multiprocessing.pool import ThreadPool as L2Pool
-
-# from uncrustimpact.multiprocessingmock import DummyPool as L1Pool
-# from uncrustimpact.multiprocessingmock import DummyPool as L2Pool
-
-from uncrustimpact.filediff import UnifiedDiffChanges
+from uncrustimpact.filediff import UnifiedDiffChanges, count_diff_changes, write_through
 from uncrustimpact.cfgparser import (
     prepare_params_space_dict,
     read_config_content,
@@ -32,14 +22,31 @@ from uncrustimpact.cfgparser import (
     write_config_content,
 )
 from uncrustimpact.printhtml import print_fit_page, print_fitparam_page
-from uncrustimpact.impacttool import generate_config_files, get_common_prefix_len, convert_path, execute_uncrustify
+from uncrustimpact.impacttool import (
+    generate_config_files,
+    get_common_prefix_len,
+    convert_path,
+    split_to_batches,
+    get_variants_languages,
+)
+from uncrustimpact.runner import write_data, is_set_option_supported
+from uncrustimpact.sourcefile import get_source_file
+from uncrustimpact.resultcache import create_result_cache, format_file, format_files_batch
 from uncrustimpact.difftool import print_diff_page
+from uncrustimpact.scheduler import TaskScheduler
+from uncrustimpact.screening import screen_params_variants, screen_variants_sample, select_sample
+from uncrustimpact.languages import get_file_language, is_language_relevant
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 _LOGGER = logging.getLogger(__name__)
 
+## number of standard errors the mean difference of changes to the best value has to exceed to drop value in racing
+RACING_Z_SCORE = 3.0
+## minimal number of files batches needed to drop value in racing
+RACING_MIN_SAMPLES = 4
+
 
 def calculate_fit(
     input_base_file_set,
@@ -49,8 +56,20 @@ def calculate_fit(
     override_def_params_space=False,
     ignore_params=None,
     consider_params=None,
+    batch_size=1,
+    jobs=None,
+    cache_dir=None,
+    cache_size=None,
+    details=False,
+    diff_engine=None,
+    fallback_encoding=None,
+    group_size=None,
+    sample_size=None,
+    sample_seed=None,
+    racing_size=None,
 ):
     os.makedirs(output_base_dir_path, exist_ok=True)
+    results_cache = create_result_cache(cache_dir, cache_size, diff_engine)
 
     params_space_dict = prepare_params_space_dict(params_space_path, override_def_params_space)
 
@@ -65,84 +84,93 @@ def calculate_fit(
         consider_params,
         include_default_value=True,
         subdir_id=True,
+        lazy_configs=is_set_option_supported(),
     )
 
     out_param_dir_path = os.path.join(output_base_dir_path, "params")
 
     _LOGGER.info("calculating files fit")
-    best_fit = {}
-    process_num = os.cpu_count()
-    # process_num = 5      # 0m49,245s
-    # process_num = 10     # 0m43,878s
-    # process_num = 15     # 0m42,055s
-    # process_num = 20     # 0m42,390s
-    # process_num = 40     # 0m39,836s
-    with L1Pool(process_num) as process_pool:
-        result_queue = []
-
-        total_parameters_variants = 0
-        for param_item in param_list:
-            param_values = param_item[2]
-            total_parameters_variants += len(param_values)
-
-        variant_counter = 0
-        for param_item in param_list:
-            param_values = param_item[2]
-
-            param_variants = []
-
-            for param_single_val in param_values:
-                variant_counter += 1
-                progress = int(variant_counter / total_parameters_variants * 10000) / 100
-                async_result = process_pool.apply_async(
-                    calculate_fit_param, [progress, param_single_val, input_base_file_set, out_param_dir_path]
-                )
-
-                param_variants.append((param_single_val, async_result))
-
-            result_queue.append((param_item, param_variants))
+    ## outputs of base config replace outputs of variants that are not calculated
+    reference_dir_path = os.path.join(output_base_dir_path, "reference")
+    reference_config_path = os.path.join(output_config_dir_path, "base.cfg")
+    if not os.path.exists(reference_config_path):
+        reference_config_path = base_config_path
+    variants_changes, skipped_files, raced_out = calculate_variants_changes(
+        param_list,
+        input_base_file_set,
+        out_param_dir_path,
+        batch_size=batch_size,
+        jobs=jobs,
+        results_cache=results_cache,
+        details=details,
+        diff_engine=diff_engine,
+        fallback_encoding=fallback_encoding,
+        group_size=group_size,
+        params_space_dict=params_space_dict,
+        reference_config_path=reference_config_path,
+        reference_dir_path=reference_dir_path,
+        sample_size=sample_size,
+        sample_seed=sample_seed,
+        racing_size=racing_size,
+    )
+    if results_cache is not None:
+        results_cache.trim()
 
-        # wait for results
-        for param_item, param_variants in result_queue:
-            if not param_variants:
+    best_fit = {}
+    params_variants = {}
+    variant_index = -1
+    for param_item in param_list:
+        param_values = param_item[2]
+        if not param_values:
+            continue
+        # collect and process param results
+        param_results = []
+        min_val = float("inf")
+        max_val = float("-inf")
+        raced_results = []
+        for param_data in param_values:
+            variant_index += 1
+            params_variants.setdefault(param_item[0], []).append((variant_index, param_data[1]))
+            param_changes_counter = variants_changes[variant_index]
+            if variant_index in raced_out:
+                # value dropped by racing - number of changes is lower bound
+                raced_results.append((f"&ge;{param_changes_counter}", param_data))
                 continue
-            # collect and process param results
-            param_results = []
-            min_val = float("inf")
-            max_val = float("-inf")
-            for param_data, async_result in param_variants:
-                param_changes_counter = async_result.get()
-                min_val = min(min_val, param_changes_counter)
-                max_val = max(max_val, param_changes_counter)
-                param_results.append((param_changes_counter, param_data))
-            min_results = [item for item in param_results if item[0] == min_val]
-            result_dict = {item[1][0]: item[1][2] for item in min_results}
-            best_values = [str(item) for item in result_dict.keys()]
-
-            cfg_value = param_item[3]
-            best_value = cfg_value
-            is_changed = False
-            if min_val != max_val:
-                # there is impact of the parameter
-                if str(cfg_value) not in best_values:
-                    # config value is not the best value
-                    is_changed = True
-
-                    param_def = param_item[1]
-                    default_value = param_def["value"]
-                    if str(default_value) not in best_values:
-                        best_value = min_results[0][1][0]  # first value
-                    else:
-                        best_value = default_value
-            # else:  # parameter does not have any impact -- ignore
-
-            # print param results
-            param_name = param_item[0]
-            param_results = sorted(param_results, key=lambda item: item[1][0])  # sort by parameter value
-            out_param_page_path = os.path.join(out_param_dir_path, param_name, "index.html")
-            print_fitparam_page(param_item, best_value, param_results, out_param_page_path)
-
-            best_fit[param_name] = (best_value, is_changed, min_val, out_param_page_path, out_param_dir_path)
+            min_val = min(min_val, param_changes_counter)
+            max_val = max(max_val, param_changes_counter)
+            param_results.append((param_changes_counter, param_data))
+        min_results = [item for item in param_results if item[0] == min_val]
+        if raced_results:
+            # dropped values are worse than the best value
+            max_val = float("inf")
+            param_results.extend(raced_results)
+        result_dict = {item[1][0]: item[1][2] for item in min_results}
+        best_values = [str(item) for item in result_dict.keys()]
+
+        cfg_value = param_item[3]
+        best_value = cfg_value
+        is_changed = False
+        if min_val != max_val:
+            # there is impact of the parameter
+            if str(cfg_value) not in best_values:
+                # config value is not the best value
+                is_changed = True
+
+                param_def = param_item[1]
+                default_value = param_def["value"]
+                if str(default_value) not in best_values:
+                    best_value = min_results[0][1][0]  # first value
+                else:
+                    best_value = default_value
+        # else:  # parameter does not have any impact -- ignore
+
+        # print param results
+        param_name = param_item[0]
+        param_results = sorted(param_results, key=lambda item: item[1][0])  # sort by parameter value
+        out_param_page_path = os.path.join(out_param_dir_path, param_name, "index.html")
+        print_fitparam_page(param_item, best_value, param_results, out_param_page_path, details=details)
+
+        best_fit[param_name] = (best_value, is_changed, min_val, out_param_page_path, out_param_dir_path)
 
     best_cfg_name = "best_config.cfg"
     params_dict = {key: item[0] for key, item in best_fit.items()}
@@ -162,6 +190,15 @@ def calculate_fit(
     for param_name, item in best_fit.items():
         is_changed = item[1]
         if is_changed:
+            if not details:
+                # outputs of variants are not written
+                continue
+            # outputs of not calculated files are the same as outputs of base config
+            for variant_index, param_id in params_variants.get(param_name, []):
+                param_dir_path = os.path.join(out_param_dir_path, param_id)
+                for file_dir_name in skipped_files.get(variant_index, []):
+                    reference_file_path = os.path.join(reference_dir_path, file_dir_name)
+                    shutil.copyfile(reference_file_path, os.path.join(param_dir_path, file_dir_name))
             continue
         out_param_file = item[3]
         if os.path.exists(out_param_file):
@@ -169,64 +206,431 @@ def calculate_fit(
         out_param_dir = os.path.join(item[4], param_name)
         if os.path.isdir(out_param_dir):
             shutil.rmtree(out_param_dir)
-
-
-def calculate_fit_param(progress, param_data, input_file_path_set, output_base_dir_path):
-    _LOGGER.info("handling parameter %s%%: %s", progress, param_data[1])
-
+    if os.path.isdir(reference_dir_path):
+        shutil.rmtree(reference_dir_path)
+
+
+## calculate number of changes of each variant (in order of 'param_list')
+## every (variant, files batch) pair is separate task of single scheduler
+## tasks are ordered by files batch, so workers format the same inputs one after another
+## and reuse input files cached in process (see 'get_source_file')
+## changes are counted directly from diffs, output, diff and page of variant are generated only if 'details' is set
+##
+## some files are not formatted with variant, because output of the variant is the same as output of base
+## config ('reference_config_path', outputs are stored in 'reference_dir_path'):
+## - files of languages the parameter of variant does not apply to (see 'get_param_languages')
+## - all files in case of variants without impact found by group screening (if 'group_size' is given)
+## - all files in case of variants without impact on sample of files (if 'sample_size' is given, see 'select_sample')
+## such files get number of changes of base config
+##
+## if 'racing_size' is given, then values of parameters race (successive halving): all values are calculated
+## on first 'racing_size' files batches, values clearly worse than the best value are dropped and remaining
+## values are calculated on twice as many next batches, until all batches are calculated
+## number of changes of dropped value is calculated only for batches before drop (it is lower bound)
+##
+## returns tuple (list of changes numbers, dict mapping variant index to list of not formatted files (dir names),
+## dict mapping index of variant dropped by racing to number of calculated files)
+def calculate_variants_changes(
+    param_list,
+    input_file_path_set,
+    output_base_dir_path,
+    batch_size=1,
+    jobs=None,
+    results_cache=None,
+    details=False,
+    diff_engine=None,
+    fallback_encoding=None,
+    group_size=None,
+    params_space_dict=None,
+    reference_config_path=None,
+    reference_dir_path=None,
+    sample_size=None,
+    sample_seed=None,
+    racing_size=None,
+):
     path_prefix_len = get_common_prefix_len(input_file_path_set)
 
-    param_changes_counter = 0
-
-    param_id = param_data[1]  # param name and value
-    input_cfg_path = param_data[2]
-
-    param_dir_path = os.path.join(output_base_dir_path, param_id)
-    os.makedirs(param_dir_path, exist_ok=True)
-
-    threads_num = os.cpu_count()
-    with L2Pool(threads_num) as process_pool:
-        result_queue = []
-        for input_file_path in input_file_path_set:
-            file_rel_path = input_file_path[path_prefix_len:]
-            file_dir_name = convert_path(file_rel_path)
-            out_file_path = os.path.join(param_dir_path, file_dir_name)
-
-            async_result = process_pool.apply_async(
-                calculate_fit_file, [input_cfg_path, input_file_path, out_file_path, param_dir_path]
+    files_list = []
+    for input_file_path in sorted(input_file_path_set):
+        file_rel_path = input_file_path[path_prefix_len:]
+        file_dir_name = convert_path(file_rel_path)
+        files_list.append((input_file_path, file_dir_name))
+    ## batches hold indexes of files in 'files_list'
+    files_batches = split_to_batches(range(0, len(files_list)), batch_size)
+
+    variants_list = []
+    for param_item in param_list:
+        param_values = param_item[2]
+        for param_data in param_values:
+            variants_list.append(param_data)
+
+    total_variants = len(variants_list)
+    variants_changes = [0] * total_variants
+
+    ## sets of indexes of files not formatted with variant, variants of parameters of the same languages
+    ## share the same set, variants without impact share set of all files
+    skipped_files = {}
+    all_files = frozenset(range(0, len(files_list)))
+    if reference_config_path and reference_dir_path:
+        files_languages = [get_file_language(item[0]) for item in files_list]
+        languages_skipped = {}
+        for variant_index, param_languages in enumerate(get_variants_languages(param_list)):
+            if param_languages is None:
+                continue
+            variant_skipped = languages_skipped.get(param_languages)
+            if variant_skipped is None:
+                variant_skipped = frozenset(
+                    file_index
+                    for file_index, file_language in enumerate(files_languages)
+                    if not is_language_relevant(param_languages, file_language)
+                )
+                if variant_skipped == all_files:
+                    variant_skipped = all_files
+                languages_skipped[param_languages] = variant_skipped
+            if variant_skipped:
+                skipped_files[variant_index] = variant_skipped
+        _LOGGER.info("variants not applicable to language of some of files: %s", len(skipped_files))
+
+    can_screen = reference_config_path and reference_dir_path
+    screening = group_size is not None and group_size > 1 and can_screen
+    sampling = sample_size is not None and 0 < sample_size < len(files_list) and can_screen
+    if (screening or sampling) and details:
+        _LOGGER.info("screening is not available with details - screening skipped")
+        screening = False
+        sampling = False
+
+    with TaskScheduler(jobs) as scheduler:
+        reference_changes = []
+        if skipped_files or screening or sampling:
+            reference_dict = format_reference_files(
+                scheduler, files_list, reference_config_path, reference_dir_path, results_cache, diff_engine
             )
-            result_queue.append(async_result)
-
-        # wait for results
-        for async_result in result_queue:
-            param_changes_counter += async_result.get()
-
-    return param_changes_counter
-
-
-def calculate_fit_file(input_cfg_path, input_file_path, out_file_path, out_param_dir_path):
-    execute_uncrustify(input_file_path, input_cfg_path, out_file_path)
+            reference_changes = [reference_dict[input_file_path] for input_file_path, _ in files_list]
+        variants_indexes = list(range(0, total_variants))
+        if sampling:
+            sample_indexes = select_sample([item[0] for item in files_list], sample_size, sample_seed)
+            sample_variants = []
+            for variant_index in variants_indexes:
+                variant_skipped = skipped_files.get(variant_index, frozenset())
+                variant_files = [
+                    (files_list[file_index][0], os.path.join(reference_dir_path, files_list[file_index][1]))
+                    for file_index in sample_indexes
+                    if file_index not in variant_skipped
+                ]
+                if variant_files:
+                    sample_variants.append((variant_index, variants_list[variant_index][3], variant_files))
+            survivors = screen_variants_sample(scheduler, sample_variants, len(files_list))
+            pruned_variants = set(item[0] for item in sample_variants) - survivors
+            for variant_index in pruned_variants:
+                skipped_files[variant_index] = all_files
+            variants_indexes = [item for item in variants_indexes if item not in pruned_variants]
+        if screening:
+            run_configs_list = [item[3] for item in variants_list]
+            screening_files = [
+                (input_file_path, os.path.join(reference_dir_path, file_dir_name))
+                for input_file_path, file_dir_name in files_list
+            ]
+            survivors = screen_params_variants(
+                scheduler, run_configs_list, screening_files, group_size, params_space_dict, variants_indexes
+            )
+            if survivors is not None:
+                for variant_index in variants_indexes:
+                    if variant_index not in survivors:
+                        skipped_files[variant_index] = all_files
+
+        ## changes of each variant on each files batch (unit of racing), files not calculated for
+        ## variant have changes of base config - added when batch is raced, except variants not
+        ## formatting any file, which are known up front
+        units_changes = [[0] * len(files_batches) for _ in range(0, total_variants)]
+        reference_units = []
+        if reference_changes:
+            reference_units = [
+                sum(reference_changes[file_index] for file_index in batch_data) for batch_data in files_batches
+            ]
+        for variant_index, variant_skipped in skipped_files.items():
+            if variant_skipped is all_files:
+                units_changes[variant_index] = list(reference_units)
+            param_dir_path = os.path.join(output_base_dir_path, variants_list[variant_index][1])
+            os.makedirs(param_dir_path, exist_ok=True)
+
+        params_variants = []
+        params_begin = 0
+        for param_item in param_list:
+            params_end = params_begin + len(param_item[2])
+            params_variants.append(list(range(params_begin, params_end)))
+            params_begin = params_end
+
+        ## racing: variants are calculated on growing number of files batches, variants clearly worse
+        ## than the best variant of parameter are dropped after each round
+        ## batches are raced in random order, so first rounds are not biased to single directory
+        ## variants not formatting any file are not scheduled, but still compete as exact results
+        alive_variants = set(
+            variant_index
+            for variant_index in range(0, total_variants)
+            if skipped_files.get(variant_index) is not all_files
+        )
+        raced_out = {}
+        units_order = list(range(0, len(files_batches)))
+        if racing_size:
+            random.Random(sample_seed).shuffle(units_order)
+        units_done = 0
+        for units_end in get_racing_rounds(len(files_batches), racing_size):
+            if units_done > 0:
+                _LOGGER.info(
+                    "racing: %s of %s files batches calculated, variants left: %s",
+                    units_done,
+                    len(files_batches),
+                    len(alive_variants),
+                )
+            tasks_queue = deque()
+            variants_remaining = [0] * total_variants
+            round_variants = sorted(alive_variants)
+            for unit_index in units_order[units_done:units_end]:
+                batch_data = files_batches[unit_index]
+                for variant_index in round_variants:
+                    variant_batch = batch_data
+                    variant_skipped = skipped_files.get(variant_index)
+                    if variant_skipped:
+                        variant_batch = [file_index for file_index in batch_data if file_index not in variant_skipped]
+                        units_changes[variant_index][unit_index] = sum(
+                            reference_changes[file_index] for file_index in batch_data if file_index in variant_skipped
+                        )
+                        if not variant_batch:
+                            continue
+                    tasks_queue.append((variant_index, unit_index, variant_batch))
+                    variants_remaining[variant_index] += 1
+            total_tasks = len(tasks_queue)
+            tasks_done = 0
+
+            while True:
+                while tasks_queue and not scheduler.is_full():
+                    variant_index, unit_index, batch_data = tasks_queue.popleft()
+                    param_data = variants_list[variant_index]
+                    param_id = param_data[1]  # param name and value
+                    run_config = param_data[3]
+                    param_dir_path = os.path.join(output_base_dir_path, param_id)
+                    os.makedirs(param_dir_path, exist_ok=True)
+                    files_data = [
+                        (files_list[file_index][0], os.path.join(param_dir_path, files_list[file_index][1]))
+                        for file_index in batch_data
+                    ]
+                    task_key = (variant_index, unit_index)
+                    if len(files_data) > 1:
+                        args = [
+                            run_config,
+                            files_data,
+                            param_dir_path,
+                            results_cache,
+                            details,
+                            diff_engine,
+                            fallback_encoding,
+                        ]
+                        scheduler.submit(task_key, calculate_fit_batch, args)
+                    else:
+                        input_file_path, out_file_path = files_data[0]
+                        args = [
+                            run_config,
+                            input_file_path,
+                            out_file_path,
+                            param_dir_path,
+                            results_cache,
+                            details,
+                            diff_engine,
+                            fallback_encoding,
+                        ]
+                        scheduler.submit(task_key, calculate_fit_file, args)
+
+                if scheduler.pending() < 1:
+                    break
+
+                (variant_index, unit_index), changes_counter = scheduler.get_result()
+                units_changes[variant_index][unit_index] += changes_counter
+                variants_remaining[variant_index] -= 1
+                tasks_done += 1
+                if variants_remaining[variant_index] < 1:
+                    progress = int(tasks_done / total_tasks * 10000) / 100
+                    _LOGGER.info("parameter calculated %s%%: %s", progress, variants_list[variant_index][1])
+
+            units_done = units_end
+            if units_done >= len(files_batches):
+                break
+            raced_files = sum(len(files_batches[index]) for index in units_order[:units_done])
+            for variants_indexes in params_variants:
+                param_racing = [
+                    item for item in variants_indexes if item in alive_variants or skipped_files.get(item) is all_files
+                ]
+                for variant_index in race_variants(param_racing, units_changes, units_order[:units_done]):
+                    if variant_index in alive_variants:
+                        alive_variants.remove(variant_index)
+                        raced_out[variant_index] = raced_files
+
+    for variant_index in range(0, total_variants):
+        variants_changes[variant_index] = sum(units_changes[variant_index])
+    if raced_out:
+        _LOGGER.info("racing: %s of %s variants dropped before calculating all files", len(raced_out), total_variants)
+
+    ## lists of dir names are shared by variants sharing set of skipped files
+    skipped_dict = {}
+    skipped_names = {}
+    for variant_index, variant_skipped in skipped_files.items():
+        names_list = skipped_names.get(id(variant_skipped))
+        if names_list is None:
+            names_list = [files_list[file_index][1] for file_index in sorted(variant_skipped)]
+            skipped_names[id(variant_skipped)] = names_list
+        skipped_dict[variant_index] = names_list
+    return variants_changes, skipped_dict, raced_out
+
+
+## sizes (numbers of files batches calculated so far) of subsequent rounds of racing
+## first round covers 'racing_size' batches and each next round covers twice as many new batches
+## returns single round if racing is disabled
+def get_racing_rounds(units_num, racing_size=None):
+    if racing_size is None or racing_size < 1:
+        return [units_num]
+    ret_list = []
+    round_size = racing_size
+    units_end = 0
+    while units_end < units_num:
+        units_end = min(units_end + round_size, units_num)
+        ret_list.append(units_end)
+        round_size *= 2
+    return ret_list
+
+
+## find variants (of single parameter) clearly worse than leader (variant with smallest number of changes)
+## considering calculated files batches ('units_list'), returns list of indexes of such variants
+def race_variants(variants_indexes, units_changes, units_list, z_score=RACING_Z_SCORE):
+    if len(variants_indexes) < 2:
+        return []
+    totals = {index: sum(units_changes[index][unit] for unit in units_list) for index in variants_indexes}
+    leader = min(variants_indexes, key=lambda index: (totals[index], index))
+    leader_changes = units_changes[leader]
+    ret_list = []
+    for variant_index in variants_indexes:
+        if variant_index == leader:
+            continue
+        variant_changes = units_changes[variant_index]
+        diffs_list = [variant_changes[unit] - leader_changes[unit] for unit in units_list]
+        if is_clearly_worse(diffs_list, z_score):
+            ret_list.append(variant_index)
+    return ret_list
+
+
+## check if mean of paired differences of changes is positive with high confidence
+## (mean minus 'z_score' standard errors is above zero)
+def is_clearly_worse(diffs_list, z_score=RACING_Z_SCORE):
+    samples_num = len(diffs_list)
+    if samples_num < RACING_MIN_SAMPLES:
+        return False
+    mean = sum(diffs_list) / samples_num
+    if mean <= 0:
+        return False
+    variance = sum((item - mean) ** 2 for item in diffs_list) / (samples_num - 1)
+    return mean - z_score * math.sqrt(variance / samples_num) > 0
+
+
+## format input files with base config, outputs are stored in 'reference_dir_path'
+## returns dict mapping input file path to number of changes
+def format_reference_files(
+    scheduler: TaskScheduler, files_list, config_path, reference_dir_path, results_cache=None, diff_engine=None
+):
+    os.makedirs(reference_dir_path, exist_ok=True)
+    ret_dict = {}
+    files_queue = deque(files_list)
+    while True:
+        while files_queue and not scheduler.is_full():
+            input_file_path, file_dir_name = files_queue.popleft()
+            reference_file_path = os.path.join(reference_dir_path, file_dir_name)
+            args = [config_path, input_file_path, reference_file_path, results_cache, diff_engine]
+            scheduler.submit(input_file_path, calculate_reference_file, args)
+        if scheduler.pending() < 1:
+            break
+        input_file_path, changes_counter = scheduler.get_result()
+        ret_dict[input_file_path] = changes_counter
+    return ret_dict
+
+
+## format input file with base config and store output (input of screening and replacement
+## of outputs of not calculated files), returns number of changes
+def calculate_reference_file(config_path, input_file_path, reference_file_path, results_cache=None, diff_engine=None):
+    item_data, raw_diff = format_file(
+        input_file_path, config_path, results_cache, diff_engine=diff_engine, lazy_diff=True
+    )
+    write_data(reference_file_path, item_data)
+    return count_diff_changes(raw_diff)
+
+
+## calculate changes of batch of files formatted by single uncrustify execution
+## 'run_config' is pair (config path, dict of overriding parameters)
+## output files are written only if 'details' is set
+def calculate_fit_batch(
+    run_config,
+    files_data,
+    out_param_dir_path,
+    results_cache=None,
+    details=False,
+    diff_engine=None,
+    fallback_encoding=None,
+):
+    input_cfg_path, override_params = run_config
+    input_files_list = [item[0] for item in files_data]
+    batch_results = format_files_batch(
+        input_files_list, input_cfg_path, out_param_dir_path, results_cache, diff_engine, override_params
+    )
+    changes_counter = 0
+    for input_file_path, out_file_path in files_data:
+        item_data, raw_diff = batch_results[input_file_path]
+        if details:
+            write_data(out_file_path, item_data)
+            changes_counter += calculate_fit_output(
+                input_file_path, raw_diff, out_file_path, out_param_dir_path, fallback_encoding
+            )
+        else:
+            changes_counter += count_diff_changes(raw_diff)
+    return changes_counter
+
+
+## output file is written only if 'details' is set
+def calculate_fit_file(
+    run_config,
+    input_file_path,
+    out_file_path,
+    out_param_dir_path,
+    results_cache=None,
+    details=False,
+    diff_engine=None,
+    fallback_encoding=None,
+):
+    input_cfg_path, override_params = run_config
+    ## diff is consumed once, so it does not need to be materialized
+    item_data, raw_diff = format_file(
+        input_file_path,
+        input_cfg_path,
+        results_cache,
+        diff_engine=diff_engine,
+        lazy_diff=True,
+        override_params=override_params,
+    )
+    if details:
+        write_data(out_file_path, item_data)
+        return calculate_fit_output(input_file_path, raw_diff, out_file_path, out_param_dir_path, fallback_encoding)
+    return count_diff_changes(raw_diff)
 
-    with open(input_file_path, encoding="utf-8") as file_1:
-        filebase_text = file_1.readlines()
-    changes = UnifiedDiffChanges("base", filebase_text)
 
-    with open(out_file_path, encoding="utf-8") as item_file:
-        item_text = item_file.readlines()
-    raw_diff = changes.calculate_diff(item_text)
-    changes.parse_diff(None, raw_diff)
-    # changes.parse_diff("change", raw_diff)
+def calculate_fit_output(input_file_path, raw_diff, out_file_path, out_param_dir_path, fallback_encoding=None):
+    input_source = get_source_file(input_file_path)
+    changes = UnifiedDiffChanges("base", input_source)
 
-    # write files diff to file
+    # write files diff to file while parsing it
     # diff_filename = name_to_diff_filename(param_id)
     out_diff_path = os.path.join(out_param_dir_path, "diff.txt")
-    raw_diff = "".join(raw_diff)
-    with open(out_diff_path, "w", encoding="utf-8") as out_file:
-        out_file.write(raw_diff)
+    with open(out_diff_path, "wb") as out_file:
+        changes.parse_diff(None, write_through(raw_diff, out_file))
+        # changes.parse_diff("change", raw_diff)
 
     out_diff_page_path = os.path.join(out_param_dir_path, "index.html")
     input_filename = os.path.basename(out_file_path)
-    print_diff_page(changes, out_diff_page_path, input_filename)
+    print_diff_page(changes, out_diff_page_path, input_filename, fallback_encoding)
 
     return changes.count_changes()
 
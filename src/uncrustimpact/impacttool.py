@@ -12,18 +12,18 @@ import copy
 import re
 from collections import Counter
 import json
-
-# from subprocess import Popen, PIPE  # nosec
-
-from multiprocessing import Pool as L1Pool
-from multiprocessing.pool import ThreadPool as L2Pool
-
-# from uncrustimpact.multiprocessingmock import DummyPool as L1Pool
-# from uncrustimpact.multiprocessingmock import DummyPool as L2Pool
-
-from uncrustimpact.filediff import UnifiedDiffChanges
+from collections import deque
+
+from uncrustimpact.filediff import UnifiedDiffChanges, write_unified_diff, read_unified_diff
+from uncrustimpact.runner import write_data, is_config_include_supported, is_set_option_supported
+from uncrustimpact.sourcefile import get_source_file
+from uncrustimpact.resultcache import create_result_cache, format_file
+from uncrustimpact.scheduler import TaskScheduler
+from uncrustimpact.screening import screen_params_variants, screen_variants_sample, select_sample
+from uncrustimpact.languages import get_file_language, get_param_languages, is_language_relevant
 from uncrustimpact.cfgparser import (
     write_dict_to_cfg,
+    write_overlay_cfg,
     ParamType,
     prepare_params_space_dict,
     read_cfg_to_dict,
@@ -36,39 +36,16 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 _LOGGER = logging.getLogger(__name__)
 
+## data shared by all tasks of worker process, set once by pool initializer ('init_impact_worker')
+## tasks refer to variants by index instead of passing parameters list with each task
+_WORKER_DATA = {}
 
-def execute_uncrustify(input_file_path, input_config_path, out_file_path):
-    ## faster than subprocess
-    command = f"uncrustify -q -c {input_config_path} --no-backup -l CPP -f {input_file_path} -o {out_file_path}"
-    error_code = os.system(command)  # nosec
-    if error_code != 0:
-        _LOGGER.error("unable to execute command: %s", command)
-        raise RuntimeError("unable to execute uncrustify")
-
-    # command = [
-    #     "uncrustify",
-    #     # "-q",
-    #     "-c",
-    #     f"{input_config_path}",
-    #     "--no-backup",
-    #     "-l", "CPP"
-    #     "-f",
-    #     f"{input_file_path}",
-    #     "-o",
-    #     f"{out_file_path}",
-    # ]
-    # # print("executing:", command)
-    #
-    # with Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE) as process:  # nosec
-    #     process.wait()
-    #     error_code = process.returncode
-    #     if error_code != 0:
-    #         stdout_output = process.stdout.decode()
-    #         stderr_output = process.stderr.decode()
-    #         command_str = " ".join(command)
-    # _LOGGER.error("unable to execute command: %s\n=== std out: ===\n%s\n=== std err: ===\n%s",
-    #               command_str, stdout_output, stderr_output)
-    #         raise RuntimeError("unable to execute uncrustify")
+
+def split_to_batches(items_list, batch_size):
+    items_list = list(items_list)
+    if batch_size is None or batch_size < 1:
+        batch_size = 1
+    return [items_list[index : index + batch_size] for index in range(0, len(items_list), batch_size)]
 
 
 def calculate_impact(
@@ -79,51 +56,179 @@ def calculate_impact(
     override_def_params_space=False,
     ignore_params=None,
     consider_params=None,
+    jobs=None,
+    cache_dir=None,
+    cache_size=None,
+    diff_engine=None,
+    fallback_encoding=None,
+    group_size=None,
+    sample_size=None,
+    sample_seed=None,
 ):
     os.makedirs(output_base_dir_path, exist_ok=True)
+    results_cache = create_result_cache(cache_dir, cache_size, diff_engine)
 
     params_space_dict = prepare_params_space_dict(params_space_path, override_def_params_space)
 
     _LOGGER.info("generating config files")
     output_config_dir_path = os.path.join(output_base_dir_path, "config")
+    lazy_configs = is_set_option_supported()
     param_list = generate_config_files(
-        base_config_path, output_config_dir_path, params_space_dict, ignore_params, consider_params
+        base_config_path,
+        output_config_dir_path,
+        params_space_dict,
+        ignore_params,
+        consider_params,
+        lazy_configs=lazy_configs,
     )
     # params_list_path = os.path.join(output_base_dir_path, "config", "params_list.json")
     # with open(params_list_path, mode="w", encoding="utf-8") as params_file:
     #     json.dump(param_list, params_file)
+    variants_list = get_variants_list(param_list)
+    variants_num = len(variants_list)
+    variants_languages = get_variants_languages(param_list)
 
     path_prefix_len = get_common_prefix_len(input_base_file_set)
 
+    files_data = []
+    for file_path in sorted(input_base_file_set):
+        file_rel_path = file_path[path_prefix_len:]
+        file_dir_name = convert_path(file_rel_path)
+        file_dir_path = os.path.join(output_base_dir_path, file_dir_name)
+        files_data.append((file_rel_path, file_path, file_dir_path))
+
     _LOGGER.info("calculating files impact")
     unused_cfg_counter = Counter()
     files_stats = {}
-    with L1Pool() as process_pool:
-        result_queue = []
-
-        for file_path in input_base_file_set:
-            file_rel_path = file_path[path_prefix_len:]
-            file_dir_name = convert_path(file_rel_path)
-            file_dir_path = os.path.join(output_base_dir_path, file_dir_name)
 
-            # execute uncrustify in separate thread
-            async_result = process_pool.apply_async(
-                calculate_impact_file, [file_path, base_config_path, param_list, file_dir_path]
+    ## all tasks (base file formatting, variants formatting and file stats) are executed
+    ## by single scheduler, so number of uncrustify instances is limited by number of jobs
+    ## parameters list is sent to workers once (by initializer)
+    with TaskScheduler(jobs, initializer=init_impact_worker, initargs=(param_list,)) as scheduler:
+        files_queue = deque(range(0, len(files_data)))
+        variants_queue = deque()
+        files_base = {}
+        files_changed = {}
+        files_remaining = {}
+
+        ## variants without impact found by screening (on sample of files or by group screening)
+        ## are not calculated for each file
+        prepared_base = {}
+        variants_indexes = list(range(0, variants_num))
+        sampling = sample_size is not None and 0 < sample_size < len(files_data)
+        screening = group_size is not None and group_size > 1
+        if sampling or screening:
+            ## formatted base files are reference of screening
+            prepared_base = format_base_files(scheduler, files_data, base_config_path, results_cache)
+        if sampling:
+            sample_indexes = select_sample([item[1] for item in files_data], sample_size, sample_seed)
+            sample_variants = []
+            for variant_index in variants_indexes:
+                variant_files = [
+                    (prepared_base[file_index], prepared_base[file_index])
+                    for file_index in sample_indexes
+                    if is_language_relevant(
+                        variants_languages[variant_index], get_file_language(files_data[file_index][1])
+                    )
+                ]
+                if variant_files:
+                    sample_variants.append((variant_index, variants_list[variant_index][2], variant_files))
+            survivors = screen_variants_sample(scheduler, sample_variants, len(files_data))
+            pruned_variants = set(item[0] for item in sample_variants) - survivors
+            variants_indexes = [item for item in variants_indexes if item not in pruned_variants]
+        if screening:
+            screening_files = [(base_file_path, base_file_path) for base_file_path in prepared_base.values()]
+            run_configs_list = [item[2] for item in variants_list]
+            survivors = screen_params_variants(
+                scheduler, run_configs_list, screening_files, group_size, params_space_dict, variants_indexes
             )
-            result_queue.append((file_rel_path, async_result))
+            if survivors is not None:
+                variants_indexes = sorted(survivors)
+
+        ## variants of parameters not applicable to language of file do not change the file
+        def on_base_formatted(file_index, base_file_path):
+            files_base[file_index] = base_file_path
+            files_changed[file_index] = []
+            file_language = get_file_language(files_data[file_index][1])
+            file_variants = []
+            for index in variants_indexes:
+                if is_language_relevant(variants_languages[index], file_language):
+                    file_variants.append(index)
+            files_remaining[file_index] = len(file_variants)
+            if not file_variants:
+                submit_file_stats(file_index)
+                return
+            for index in file_variants:
+                variants_queue.append((file_index, index))
+
+        ## diffs are not passed between processes - stats task reads diffs of changed variants from files
+        def submit_file_stats(file_index):
+            _, file_path, file_dir_path = files_data[file_index]
+            changed_variants = sorted(files_changed.pop(file_index))
+            base_file_path = files_base.pop(file_index)
+            args = [file_path, base_file_path, changed_variants, file_dir_path, fallback_encoding]
+            scheduler.submit(("stats", file_index, None), calculate_impact_stats_task, args)
+
+        while True:
+            while not scheduler.is_full():
+                if variants_queue:
+                    ## variants of files in progress go first
+                    file_index, variant_index = variants_queue.popleft()
+                    file_dir_path = files_data[file_index][2]
+                    args = [files_base[file_index], variant_index, file_dir_path, results_cache, diff_engine]
+                    scheduler.submit(("variant", file_index, variant_index), calculate_variant_diff_task, args)
+                elif files_queue:
+                    file_index = files_queue.popleft()
+                    if file_index in prepared_base:
+                        on_base_formatted(file_index, prepared_base.pop(file_index))
+                        continue
+                    _, file_path, file_dir_path = files_data[file_index]
+                    args = [file_path, base_config_path, file_dir_path, results_cache]
+                    scheduler.submit(("base", file_index, None), format_base_file, args)
+                else:
+                    break
+
+            if scheduler.pending() < 1:
+                break
+
+            task_key, task_result = scheduler.get_result()
+            task_type, file_index, variant_index = task_key
+
+            if task_type == "base":
+                on_base_formatted(file_index, task_result)
+
+            elif task_type == "variant":
+                if task_result:
+                    files_changed[file_index].append(variant_index)
+                files_remaining[file_index] -= 1
+                if files_remaining[file_index] < 1:
+                    del files_remaining[file_index]
+                    submit_file_stats(file_index)
 
-        # wait for results
-        for file_rel_path, async_result in result_queue:
-            file_index_path, param_stats, unused_configs = async_result.get()
-            files_stats[file_rel_path] = (file_index_path, sum(param_stats.values()))
-            unused_cfg_counter.update(unused_configs)
+            else:
+                file_rel_path = files_data[file_index][0]
+                file_index_path, param_stats, unused_configs = task_result
+                files_stats[file_rel_path] = (file_index_path, sum(param_stats.values()))
+                unused_cfg_counter.update(unused_configs)
 
-    # remove unused configs
-    _LOGGER.info("removing unused configs")
     total_files = len(input_base_file_set)
-    for cfg_path, cfg_count in unused_cfg_counter.items():
-        if cfg_count >= total_files:
-            os.remove(cfg_path)
+    if lazy_configs:
+        # write configs of variants having impact on any file
+        _LOGGER.info("writing used configs")
+        used_configs = set()
+        for _, cfg_path, _ in get_variants_list(param_list):
+            if unused_cfg_counter[cfg_path] < total_files:
+                used_configs.add(cfg_path)
+        write_variant_configs(param_list, used_configs)
+    else:
+        # remove unused configs
+        _LOGGER.info("removing unused configs")
+        for cfg_path, cfg_count in unused_cfg_counter.items():
+            if cfg_count >= total_files:
+                os.remove(cfg_path)
+
+    if results_cache is not None:
+        results_cache.trim()
 
     files_stats = dict(sorted(files_stats.items(), key=lambda item: (-item[1][1], item[0])))
 
@@ -132,33 +237,128 @@ def calculate_impact(
     print_impact_page(files_stats, out_path)
 
 
-def calculate_impact_file(input_base_file_path, base_config_path, param_list, output_base_dir_path):
-    _LOGGER.info("handling file %s", input_base_file_path)
+## initialize worker process of 'calculate_impact'
+def init_impact_worker(param_list):
+    _WORKER_DATA["param_list"] = param_list
+    _WORKER_DATA["variants_list"] = get_variants_list(param_list)
+
 
+def calculate_variant_diff_task(
+    base_file_path, variant_index, output_base_dir_path, results_cache=None, diff_engine=None
+):
+    param_id, _, run_config = _WORKER_DATA["variants_list"][variant_index]
+    raw_diff = calculate_variant_diff(
+        base_file_path, run_config, param_id, output_base_dir_path, results_cache, diff_engine
+    )
+    ## diff is stored in file, only information about change is returned
+    return bool(raw_diff)
+
+
+## 'changed_variants' is list of indexes of variants changing the file (their diff files are written)
+def calculate_impact_stats_task(
+    input_base_file_path, base_file_path, changed_variants, output_base_dir_path, fallback_encoding=None
+):
+    param_list = _WORKER_DATA["param_list"]
+    variants_list = _WORKER_DATA["variants_list"]
+    params_dir_path = os.path.join(output_base_dir_path, "params")
+    variants_diffs = [[]] * len(variants_list)
+    for variant_index in changed_variants:
+        param_id = variants_list[variant_index][0]
+        diff_path = os.path.join(params_dir_path, name_to_diff_filename(param_id))
+        with open(diff_path, "rb") as diff_file:
+            variants_diffs[variant_index] = read_unified_diff(diff_file)
+    return calculate_impact_stats(
+        input_base_file_path, base_file_path, param_list, variants_diffs, output_base_dir_path, fallback_encoding
+    )
+
+
+def calculate_impact_file(input_base_file_path, base_config_path, param_list, output_base_dir_path):
     if isinstance(param_list, str):
         with open(param_list, encoding="utf-8") as params_file:
             param_list = json.load(params_file)
 
+    base_file_path = format_base_file(input_base_file_path, base_config_path, output_base_dir_path)
+    variants_diffs = []
+    for param_id, _, run_config in get_variants_list(param_list):
+        raw_diff = calculate_variant_diff(base_file_path, run_config, param_id, output_base_dir_path)
+        variants_diffs.append(raw_diff)
+    return calculate_impact_stats(
+        input_base_file_path, base_file_path, param_list, variants_diffs, output_base_dir_path
+    )
+
+
+## format base files of all input files, returns dict mapping file index to path to formatted file
+def format_base_files(scheduler: TaskScheduler, files_data, base_config_path, results_cache=None):
+    ret_dict = {}
+    files_queue = deque(range(0, len(files_data)))
+    while True:
+        while files_queue and not scheduler.is_full():
+            file_index = files_queue.popleft()
+            _, file_path, file_dir_path = files_data[file_index]
+            args = [file_path, base_config_path, file_dir_path, results_cache]
+            scheduler.submit(file_index, format_base_file, args)
+        if scheduler.pending() < 1:
+            break
+        file_index, base_file_path = scheduler.get_result()
+        ret_dict[file_index] = base_file_path
+    return dict(sorted(ret_dict.items()))
+
+
+## format input file with base config, returns path to formatted file
+def format_base_file(input_base_file_path, base_config_path, output_base_dir_path, results_cache=None):
+    _LOGGER.info("handling file %s", input_base_file_path)
+
     params_dir_path = os.path.join(output_base_dir_path, "params")
     os.makedirs(params_dir_path, exist_ok=True)
     input_filename = os.path.basename(input_base_file_path)
 
     # setting extension to .txt changes results
     base_file_path = os.path.join(output_base_dir_path, input_filename)
-    execute_uncrustify(input_base_file_path, base_config_path, base_file_path)
+    filebase_data, _ = format_file(input_base_file_path, base_config_path, results_cache)
+    write_data(base_file_path, filebase_data)
+    return base_file_path
+
 
-    generate_file_variants(base_file_path, param_list, params_dir_path)
+## format base file with variant config and calculate diff against base file
+## output and diff files are written only if variant introduces changes
+## 'run_config' is pair (config path, dict of overriding parameters)
+def calculate_variant_diff(
+    base_file_path, run_config, param_id, output_base_dir_path, results_cache=None, diff_engine=None
+):
+    input_cfg_path, override_params = run_config
+    item_data, raw_diff = format_file(
+        base_file_path, input_cfg_path, results_cache, diff_engine=diff_engine, override_params=override_params
+    )
+    if not raw_diff:
+        return raw_diff
 
+    params_dir_path = os.path.join(output_base_dir_path, "params")
+    out_file_path = os.path.join(params_dir_path, f"{param_id}.txt")
+    write_data(out_file_path, item_data)
+    diff_filename = name_to_diff_filename(param_id)
+    out_diff_path = os.path.join(params_dir_path, diff_filename)
+    with open(out_diff_path, "wb") as out_file:
+        write_unified_diff(out_file, raw_diff)
+    return raw_diff
+
+
+## merge diffs of all variants and generate file pages
+def calculate_impact_stats(
+    input_base_file_path, base_file_path, param_list, variants_diffs, output_base_dir_path, fallback_encoding=None
+):
     _LOGGER.info("calculating stats for file %s", input_base_file_path)
 
-    with open(base_file_path, encoding="utf-8") as file_1:
-        filebase_text = file_1.readlines()
+    params_dir_path = os.path.join(output_base_dir_path, "params")
+    input_filename = os.path.basename(input_base_file_path)
+
+    base_source = get_source_file(base_file_path)
 
-    changes = UnifiedDiffChanges("base", filebase_text)
+    changes = UnifiedDiffChanges("base", base_source)
 
     params_stats = {}
 
     unused_configs = []
+    variant_index = -1
     for param_item in param_list:
         param_name = param_item[0]
         param_def = param_item[1]
@@ -168,31 +368,22 @@ def calculate_impact_file(input_base_file_path, base_config_path, param_list, ou
         param_val_list = []
 
         for param_data in param_values:
+            variant_index += 1
             param_val = param_data[0]
             param_id = param_data[1]
             out_cfg_path = param_data[2]
             out_filename = f"{param_id}.txt"
-            out_file_path = os.path.join(params_dir_path, out_filename)
 
-            with open(out_file_path, encoding="utf-8") as item_file:
-                item_text = item_file.readlines()
-            raw_diff = changes.calculate_diff(item_text)
+            raw_diff = variants_diffs[variant_index]
             changed = changes.parse_diff(param_name, raw_diff)
 
             if not changed:
                 # remove unused files
                 # os.remove(out_cfg_path)
                 unused_configs.append(out_cfg_path)
-                os.remove(out_file_path)
                 continue
 
-            # write files diff to file
             diff_filename = name_to_diff_filename(param_id)
-            out_diff_path = os.path.join(params_dir_path, diff_filename)
-            raw_diff = changes.print_diff_list(raw_diff)
-            with open(out_diff_path, "w", encoding="utf-8") as out_file:
-                out_file.write(raw_diff)
-
             cfg_relative_path = os.path.relpath(out_cfg_path, params_dir_path)
             param_val_list.append((param_val, cfg_relative_path, out_filename, diff_filename))
 
@@ -218,7 +409,11 @@ def calculate_impact_file(input_base_file_path, base_config_path, param_list, ou
 
     # write general diff
     content = print_to_html(
-        changes, label_converter=labels_to_links, top_content=top_content, bottom_content=bottom_content
+        changes,
+        label_converter=labels_to_links,
+        top_content=top_content,
+        bottom_content=bottom_content,
+        fallback_encoding=fallback_encoding,
     )
     out_path = os.path.join(output_base_dir_path, "index.html")
     with open(out_path, "w", encoding="utf-8") as out_file:
@@ -236,6 +431,8 @@ def generate_config_files(
     consider_params=None,
     include_default_value=False,
     subdir_id=False,
+    overlay=None,
+    lazy_configs=False,
 ):
     os.makedirs(output_config_dir_path, exist_ok=True)
 
@@ -255,6 +452,18 @@ def generate_config_files(
         ## convert to standard config dict
         cfg_params_values_dict = {key: subdict["value"] for key, subdict in cfg_params_values_dict.items()}
 
+    ## in overlay mode variant config includes shared base config and overrides single parameter
+    ## full configs are written if uncrustify does not support 'include'
+    ## in lazy mode variant configs are not written - variants are formatted with base config and
+    ## changed parameter passed in command line, configs are written later only if needed (see 'write_variant_configs')
+    if overlay is None:
+        overlay = is_config_include_supported()
+    base_cfg_path = os.path.join(output_config_dir_path, "base.cfg")
+    if overlay or lazy_configs:
+        write_dict_to_cfg(cfg_params_values_dict, base_cfg_path)
+    if not overlay:
+        _LOGGER.info("uncrustify does not support config include - writing full configs")
+
     param_list = []
     for param_name, param_def in params_space_dict.items():
         if param_name in ignore_params_set:
@@ -288,12 +497,20 @@ def generate_config_files(
             else:
                 param_id = f"{param_name}-{param_val}"
             out_cfg_path = os.path.join(output_config_dir_path, f"{param_id}.cfg")
+            if lazy_configs:
+                run_config = (base_cfg_path, {param_name: param_val})
+                params_data.append((param_val, param_id, out_cfg_path, run_config))
+                continue
+
+            run_config = (out_cfg_path, None)
+            params_data.append((param_val, param_id, out_cfg_path, run_config))
             out_cfg_dir = os.path.dirname(out_cfg_path)
             os.makedirs(out_cfg_dir, exist_ok=True)
-            params_data.append((param_val, param_id, out_cfg_path))
-
             # execute uncrustify in separate thread
-            write_dict_to_cfg(curr_cfg_dict, out_cfg_path)
+            if overlay:
+                write_overlay_cfg(base_cfg_path, {param_name: param_val}, out_cfg_path)
+            else:
+                write_dict_to_cfg(curr_cfg_dict, out_cfg_path)
 
         param_list.append((param_name, param_def, params_data, curr_param_value))
 
@@ -361,19 +578,51 @@ def generate_param_values(param_name, curr_param_value, param_def_dict, include_
     raise RuntimeError(f"unahandled param type: {param_type} {type(param_type)}")
 
 
-def generate_file_variants(input_file_path, param_list, output_dir):
-    tasks_data = []
+## list of tuples (param_id, config path, run config) of all variants in order of 'param_list'
+## run config is pair (config path, dict of overriding parameters) used to format files
+def get_variants_list(param_list):
+    ret_list = []
     for param_item in param_list:
         param_values = param_item[2]
-
         for param_data in param_values:
             param_id = param_data[1]
-            input_cfg_path = param_data[2]
-            out_file_path = os.path.join(output_dir, f"{param_id}.txt")
-            tasks_data.append([input_file_path, input_cfg_path, out_file_path])
+            out_cfg_path = param_data[2]
+            run_config = param_data[3]
+            ret_list.append((param_id, out_cfg_path, run_config))
+    return ret_list
+
+
+## list of languages of all variants in order of 'param_list' (see 'get_param_languages')
+def get_variants_languages(param_list):
+    ret_list = []
+    for param_item in param_list:
+        param_languages = get_param_languages(param_item[0], param_item[1])
+        ret_list.extend([param_languages] * len(param_item[2]))
+    return ret_list
+
 
-    with L2Pool() as process_pool:
-        process_pool.starmap(execute_uncrustify, tasks_data)
+## write configs of variants generated in lazy mode, 'configs_set' limits written configs
+## configs are written as overlays of base config if uncrustify supports 'include'
+def write_variant_configs(param_list, configs_set=None):
+    overlay = is_config_include_supported()
+    base_cfg_dict = None
+    for param_item in param_list:
+        param_values = param_item[2]
+        for param_data in param_values:
+            out_cfg_path = param_data[2]
+            if configs_set is not None and out_cfg_path not in configs_set:
+                continue
+            base_cfg_path, override_params = param_data[3]
+            if not override_params:
+                ## config already written
+                continue
+            os.makedirs(os.path.dirname(out_cfg_path), exist_ok=True)
+            if overlay:
+                write_overlay_cfg(base_cfg_path, override_params, out_cfg_path)
+                continue
+            if base_cfg_dict is None:
+                base_cfg_dict = read_cfg_to_dict(base_cfg_path)
+            write_dict_to_cfg({**base_cfg_dict, **override_params}, out_cfg_path)
 
 
 def labels_to_links(labels_list):
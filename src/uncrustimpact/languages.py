@@ -0,0 +1,110 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import re
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+## language used for files of unknown extension
+DEFAULT_LANGUAGE = "CPP"
+
+## uncrustify languages (value of '-l' option) by file extension (lower case)
+## '.inc' is far more common as C/C++ include fragment than as Pawn include, ambiguous '.p' is not mapped
+EXTENSION_LANGUAGES = {
+    ".c": "C",
+    ".cpp": "CPP",
+    ".cc": "CPP",
+    ".cp": "CPP",
+    ".cxx": "CPP",
+    ".c++": "CPP",
+    ".h": "CPP",
+    ".hh": "CPP",
+    ".hpp": "CPP",
+    ".hxx": "CPP",
+    ".h++": "CPP",
+    ".inl": "CPP",
+    ".ipp": "CPP",
+    ".tcc": "CPP",
+    ".inc": "CPP",
+    ".d": "D",
+    ".di": "D",
+    ".cs": "CS",
+    ".vala": "VALA",
+    ".java": "JAVA",
+    ".pawn": "PAWN",
+    ".sma": "PAWN",
+    ".m": "OC",
+    ".mm": "OC+",
+    ".sqc": "C",
+    ".es": "ECMA",
+}
+
+## languages of tags starting documentation of parameters in uncrustify config, e.g. "# (OC) Whether to ..."
+DOC_TAG_LANGUAGES = {
+    "C#": frozenset(["CS", "VALA"]),
+    "D": frozenset(["D"]),
+    "Java": frozenset(["JAVA"]),
+    "OC": frozenset(["OC", "OC+"]),
+    "Pawn": frozenset(["PAWN"]),
+    "Vala": frozenset(["VALA"]),
+    "ECMA": frozenset(["ECMA"]),
+}
+
+## languages of parameters not tagged in documentation (or tagged incorrectly)
+PARAM_LANGUAGES_OVERRIDE = {
+    "sp_vala_after_translation": frozenset(["VALA"]),
+    "cmt_insert_oc_msg_header": frozenset(["OC", "OC+"]),
+    "sp_getset_brace": frozenset(["CS", "VALA", "D"]),
+    "nl_getset_brace": frozenset(["CS", "VALA", "D"]),
+    "nl_getset_leave_one_liners": frozenset(["CS", "VALA", "D"]),
+    "nl_synchronized_brace": frozenset(["JAVA"]),
+    "nl_before_synchronized": frozenset(["JAVA"]),
+    "nl_after_synchronized": frozenset(["JAVA"]),
+}
+
+DOC_TAG_REGEX = re.compile(r"^#\s*\(([^)]+)\)")
+
+
+## language of file passed to uncrustify
+def get_file_language(file_path):
+    _, file_ext = os.path.splitext(file_path)
+    return EXTENSION_LANGUAGES.get(file_ext.lower(), DEFAULT_LANGUAGE)
+
+
+## languages parameter applies to, returns None if parameter applies to all languages
+## languages are read from tag of documentation (see 'DOC_TAG_LANGUAGES') and 'PARAM_LANGUAGES_OVERRIDE'
+def get_param_languages(param_name, param_def=None):
+    languages = PARAM_LANGUAGES_OVERRIDE.get(param_name)
+    if languages is not None:
+        return languages
+    if not param_def:
+        return None
+    doc_string = param_def.get("doc")
+    if not doc_string:
+        return None
+    found = DOC_TAG_REGEX.match(doc_string.lstrip())
+    if found is None:
+        return None
+    ret_set = set()
+    for tag in re.split(r"[/,]", found.group(1)):
+        tag_languages = DOC_TAG_LANGUAGES.get(tag.strip())
+        if tag_languages is None:
+            ## not a language tag (e.g. '(C++11)') - parameter is not restricted
+            return None
+        ret_set.update(tag_languages)
+    return frozenset(ret_set)
+
+
+## check if parameter of given languages ('get_param_languages') can change file of given language
+def is_language_relevant(param_languages, file_language):
+    if param_languages is None:
+        return True
+    return file_language in param_languages
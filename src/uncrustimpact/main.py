@@ -18,6 +18,8 @@ from uncrustimpact.cfgparser import print_params_space
 from uncrustimpact.impacttool import calculate_impact
 from uncrustimpact.difftool import calculate_diff
 from uncrustimpact.fittool import calculate_fit
+from uncrustimpact.diffengine import DIFF_ENGINES, DEFAULT_DIFF_ENGINE
+from uncrustimpact.runner import DEFAULT_FALLBACK_ENCODING
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -54,6 +56,14 @@ def calculate_impact_tool(args):
         override_def_params_space=override_def_params_space,
         ignore_params=ignore_params,
         consider_params=consider_params,
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        diff_engine=args.diffengine,
+        fallback_encoding=args.fallback_encoding,
+        group_size=args.group_size,
+        sample_size=args.sample_size,
+        sample_seed=args.sample_seed,
     )
     _LOGGER.info("Completed")
 
@@ -67,7 +77,16 @@ def calculate_diff_tool(args):
 
     input_config_path = args.config
     output_dir_path = args.outputdir
-    calculate_diff(files_set, input_config_path, output_dir_path)
+    calculate_diff(
+        files_set,
+        input_config_path,
+        output_dir_path,
+        batch_size=args.batchsize,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        diff_engine=args.diffengine,
+        fallback_encoding=args.fallback_encoding,
+    )
     _LOGGER.info("Completed")
 
 
@@ -92,6 +111,17 @@ def calculate_fit_tool(args):
         override_def_params_space=override_def_params_space,
         ignore_params=ignore_params,
         consider_params=consider_params,
+        batch_size=args.batchsize,
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        diff_engine=args.diffengine,
+        fallback_encoding=args.fallback_encoding,
+        details=args.details,
+        group_size=args.group_size,
+        sample_size=args.sample_size,
+        sample_seed=args.sample_seed,
+        racing_size=args.racing_size,
     )
     _LOGGER.info("Completed")
 
@@ -156,6 +186,53 @@ def main():
     )
     subparser.add_argument("-ip", "--ignoreparams", nargs="+", default=[], help="Parameters list to ignore")
     subparser.add_argument("-cp", "--considerparams", nargs="+", default=[], help="Parameters list to consider")
+    subparser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        default=None,
+        help="Number of tasks executed in parallel. Number of CPUs is used if not given.",
+    )
+    subparser.add_argument(
+        "--cache-dir", action="store", help="Directory of results cache persisted between executions"
+    )
+    subparser.add_argument(
+        "--cache-size", action="store", type=int, default=1024, help="Maximum size of results cache in MB"
+    )
+    subparser.add_argument(
+        "-de",
+        "--diffengine",
+        action="store",
+        choices=list(DIFF_ENGINES.keys()),
+        default=DEFAULT_DIFF_ENGINE,
+        help="Algorithm of calculating diffs",
+    )
+    subparser.add_argument(
+        "--fallback-encoding",
+        action="store",
+        default=DEFAULT_FALLBACK_ENCODING,
+        help="Encoding used to present content of files that are not valid UTF-8",
+    )
+    subparser.add_argument(
+        "--group-size",
+        action="store",
+        type=int,
+        default=0,
+        help="Screen variants without impact by formatting files with groups of variants of given size"
+        " (requires uncrustify supporting '--set'). 0 disables screening.",
+    )
+    subparser.add_argument(
+        "--sample-size",
+        action="store",
+        type=int,
+        default=0,
+        help="Prune variants that do not change any file of stratified sample of files of given size"
+        " (pruned variants are estimated to have no impact). 0 disables sampling.",
+    )
+    subparser.add_argument(
+        "--sample-seed", action="store", type=int, default=0, help="Seed of random selection of sample of files"
+    )
 
     ## =================================================
 
@@ -173,6 +250,34 @@ def main():
     )
     subparser.add_argument("-c", "--config", action="store", required=True, help="Base uncrustify config")
     subparser.add_argument("-od", "--outputdir", action="store", required=True, help="Output directory")
+    subparser.add_argument(
+        "-bs",
+        "--batchsize",
+        action="store",
+        type=int,
+        default=1,
+        help="Number of files formatted by single uncrustify execution",
+    )
+    subparser.add_argument(
+        "--cache-dir", action="store", help="Directory of results cache persisted between executions"
+    )
+    subparser.add_argument(
+        "--cache-size", action="store", type=int, default=1024, help="Maximum size of results cache in MB"
+    )
+    subparser.add_argument(
+        "-de",
+        "--diffengine",
+        action="store",
+        choices=list(DIFF_ENGINES.keys()),
+        default=DEFAULT_DIFF_ENGINE,
+        help="Algorithm of calculating diffs",
+    )
+    subparser.add_argument(
+        "--fallback-encoding",
+        action="store",
+        default=DEFAULT_FALLBACK_ENCODING,
+        help="Encoding used to present content of files that are not valid UTF-8",
+    )
 
     ## =================================================
 
@@ -202,6 +307,76 @@ def main():
     )
     subparser.add_argument("-ip", "--ignoreparams", nargs="+", default=[], help="Parameters list to ignore")
     subparser.add_argument("-cp", "--considerparams", nargs="+", default=[], help="Parameters list to consider")
+    subparser.add_argument(
+        "-bs",
+        "--batchsize",
+        action="store",
+        type=int,
+        default=1,
+        help="Number of files formatted by single uncrustify execution",
+    )
+    subparser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        default=None,
+        help="Number of (variant, files batch) tasks executed in parallel. Number of CPUs is used if not given.",
+    )
+    subparser.add_argument(
+        "--racing-size",
+        action="store",
+        type=int,
+        default=0,
+        help="Race values of parameters: calculate all values on given number of files batches, drop values clearly"
+        " worse than the best one and double number of batches for the rest (batches are taken in random order"
+        " depending on --sample-seed). 0 disables racing.",
+    )
+    subparser.add_argument(
+        "-dt",
+        "--details",
+        action="store_true",
+        help="Generate formatted files, diff and page for each parameter value (slower, by default only changes are counted)",
+    )
+    subparser.add_argument(
+        "--cache-dir", action="store", help="Directory of results cache persisted between executions"
+    )
+    subparser.add_argument(
+        "--cache-size", action="store", type=int, default=1024, help="Maximum size of results cache in MB"
+    )
+    subparser.add_argument(
+        "-de",
+        "--diffengine",
+        action="store",
+        choices=list(DIFF_ENGINES.keys()),
+        default=DEFAULT_DIFF_ENGINE,
+        help="Algorithm of calculating diffs",
+    )
+    subparser.add_argument(
+        "--fallback-encoding",
+        action="store",
+        default=DEFAULT_FALLBACK_ENCODING,
+        help="Encoding used to present content of files that are not valid UTF-8",
+    )
+    subparser.add_argument(
+        "--group-size",
+        action="store",
+        type=int,
+        default=0,
+        help="Screen variants without impact by formatting files with groups of variants of given size"
+        " (requires uncrustify supporting '--set'). 0 disables screening.",
+    )
+    subparser.add_argument(
+        "--sample-size",
+        action="store",
+        type=int,
+        default=0,
+        help="Prune variants that do not change any file of stratified sample of files of given size"
+        " (pruned variants are estimated to have no impact). 0 disables sampling.",
+    )
+    subparser.add_argument(
+        "--sample-seed", action="store", type=int, default=0, help="Seed of random selection of sample of files"
+    )
 
     ## =================================================
 
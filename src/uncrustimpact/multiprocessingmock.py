@@ -17,8 +17,9 @@ class ResultObject:
 
 # single threaded pool with multiprocessing.Pool interface
 class DummyPool:
-    def __init__(self, *args, **kwargs):
-        pass
+    def __init__(self, *args, initializer=None, initargs=(), **kwargs):
+        if initializer is not None:
+            initializer(*initargs)
 
     def __enter__(self):
         return self
@@ -26,8 +27,17 @@ class DummyPool:
     def __exit__(self, type, value, traceback):  # pylint: disable=W0622
         pass
 
-    def apply_async(self, func, args=()):
-        return ResultObject(func(*args))
+    def apply_async(self, func, args=(), callback=None, error_callback=None):
+        try:
+            result = func(*args)
+        except Exception as exc:  # pylint: disable=W0703
+            if error_callback is None:
+                raise
+            error_callback(exc)
+            return ResultObject(None)
+        if callback is not None:
+            callback(result)
+        return ResultObject(result)
 
     def starmap(self, func, iterable=()):
         for args in iterable:
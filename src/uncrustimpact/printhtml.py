@@ -12,12 +12,16 @@ import html
 from uncrustimpact.filediff import LineModifier
 from uncrustimpact.filediff import Changes
 from uncrustimpact.cfgparser import ParamType
+from uncrustimpact.runner import decode_content
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
-def print_to_html(changes: Changes, label_converter=None, top_content=None, bottom_content=None) -> str:
+## lines of bytes are decoded as UTF-8 or with fallback encoding if content is not valid UTF-8
+def print_to_html(
+    changes: Changes, label_converter=None, top_content=None, bottom_content=None, fallback_encoding=None
+) -> str:
     ret_content = """\
 <html>
 <head>
@@ -59,6 +63,8 @@ def print_to_html(changes: Changes, label_converter=None, top_content=None, bott
             index_content = f"<pre>{line_num}:</pre>"
 
         if line_content:
+            if isinstance(line_content, (bytes, memoryview)):
+                line_content = decode_content(line_content, fallback_encoding)
             line_content = line_content.rstrip("\r\n")
             line_content = html.escape(line_content)
             line_content = f"<pre>{line_content}</pre>"
@@ -285,7 +291,7 @@ def print_fit_page(best_cfg_path, best_fit, output_path):
         out_file.write(content)
 
 
-def print_fitparam_page(param_item, best_value, param_results, output_file_path):
+def print_fitparam_page(param_item, best_value, param_results, output_file_path, details=True):
     param_name = param_item[0]
     param_def = param_item[1]
     cfg_value = param_item[3]
@@ -329,6 +335,16 @@ def print_fitparam_page(param_item, best_value, param_results, output_file_path)
             param_val = param_data[0]
             param_dir = param_val
             # param_dir = param_data[1]
+            if not details:
+                ## diff and page of value not generated
+                content += f"""\
+        <tr> \
+<td>{param_val}</td> \
+<td>{param_changes_counter}</td> \
+</tr>
+"""
+                continue
+
             change_link = f"""<a href="{param_dir}/index.html">{param_changes_counter}</a>"""
 
             diff_link = f"""{param_dir}/diff.txt"""
@@ -0,0 +1,257 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import logging
+import re
+import json
+import hashlib
+import functools
+import shutil
+import tempfile
+
+from uncrustimpact.filediff import iterate_unified_diff
+from uncrustimpact.diffengine import DEFAULT_DIFF_ENGINE
+from uncrustimpact.runner import execute_uncrustify_pipe, execute_uncrustify_batch, split_lines, get_uncrustify_id
+from uncrustimpact.fileutils import calculate_hash, touch_file, write_atomic
+from uncrustimpact.languages import DEFAULT_LANGUAGE, get_file_language
+from uncrustimpact.sourcefile import SourceFile, get_source_file
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_LOGGER = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024  # 1GB
+
+## version of format of entries - changing it invalidates existing entries
+ENTRY_VERSION = 3
+
+INCLUDE_REGEX = re.compile(r"""^\s*include\s+["']?([^"'\s]+)["']?\s*$""")
+
+
+## persistent content-addressed cache of uncrustify results
+## entry is identified by hash of input content, hash of effective config, language of input,
+## uncrustify binary/version and diff engine
+## entry holds hash of formatted output and diff to input, formatted content is stored
+## separately (by its hash) and only if it differs from input
+## least recently used files are removed when cache exceeds given size
+class ResultCache:
+    def __init__(self, cache_dir_path, max_size=None, tool_id=None, diff_engine=None):
+        self.cache_dir_path = os.path.abspath(cache_dir_path)
+        self.max_size = max_size if max_size is not None else DEFAULT_CACHE_SIZE
+        if tool_id is None:
+            tool_id = get_uncrustify_id()
+        self.tool_id = tool_id
+        self.diff_engine = diff_engine if diff_engine else DEFAULT_DIFF_ENGINE
+        os.makedirs(self.cache_dir_path, exist_ok=True)
+
+    ## returns pair (output data, diff) or None if result is not cached
+    def get(self, input_data, input_config_path, input_hash=None, override_params=None, language=None):
+        if input_hash is None:
+            input_hash = calculate_hash(input_data)
+        entry_path = self._entry_path(input_hash, input_config_path, override_params, language)
+        try:
+            with open(entry_path, encoding="utf-8") as entry_file:
+                entry_dict = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+        output_hash = entry_dict["output"]
+        if output_hash == input_hash:
+            output_data = bytes(input_data)
+        else:
+            blob_path = self._blob_path(output_hash)
+            try:
+                with open(blob_path, "rb") as blob_file:
+                    output_data = blob_file.read()
+            except OSError:
+                ## content evicted
+                return None
+            touch_file(blob_path)
+        touch_file(entry_path)
+        ## diff lines are bytes stored as latin-1 strings (lossless conversion)
+        raw_diff = [line.encode("latin-1") for line in entry_dict["diff"]]
+        return output_data, raw_diff
+
+    def put(
+        self, input_data, input_config_path, output_data, raw_diff, input_hash=None, override_params=None, language=None
+    ):
+        if input_hash is None:
+            input_hash = calculate_hash(input_data)
+        output_hash = calculate_hash(output_data)
+        if output_hash != input_hash:
+            blob_path = self._blob_path(output_hash)
+            if not os.path.exists(blob_path):
+                write_atomic(blob_path, output_data)
+        entry_dict = {"output": output_hash, "diff": [line.decode("latin-1") for line in raw_diff]}
+        entry_data = json.dumps(entry_dict).encode("utf-8")
+        entry_path = self._entry_path(input_hash, input_config_path, override_params, language)
+        write_atomic(entry_path, entry_data)
+
+    ## remove least recently used files until cache fits in its size
+    def trim(self):
+        files_list = []
+        total_size = 0
+        for root_dir, _, file_names in os.walk(self.cache_dir_path):
+            for file_name in file_names:
+                file_path = os.path.join(root_dir, file_name)
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files_list.append((file_stat.st_mtime_ns, file_stat.st_size, file_path))
+                total_size += file_stat.st_size
+        if total_size <= self.max_size:
+            return
+        _LOGGER.info("trimming results cache: %s bytes over limit", total_size - self.max_size)
+        files_list.sort()
+        for _, file_size, file_path in files_list:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total_size -= file_size
+
+    def _entry_path(self, input_hash, input_config_path, override_params=None, language=None):
+        if language is None:
+            language = DEFAULT_LANGUAGE
+        config_hash = calculate_config_hash(input_config_path)
+        if override_params:
+            params_data = "\n".join(f"{name}={value}" for name, value in sorted(override_params.items()))
+            config_hash = calculate_hash(f"{config_hash}\n{params_data}".encode("utf-8"))
+        key_data = f"{ENTRY_VERSION}\n{self.tool_id}\n{self.diff_engine}\n{language}\n{config_hash}\n{input_hash}"
+        key_data = key_data.encode("utf-8")
+        entry_hash = calculate_hash(key_data)
+        return os.path.join(self.cache_dir_path, "entries", entry_hash[:2], entry_hash)
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.cache_dir_path, "objects", content_hash[:2], content_hash)
+
+
+def create_result_cache(cache_dir_path, max_size=None, diff_engine=None):
+    if not cache_dir_path:
+        return None
+    return ResultCache(cache_dir_path, max_size, diff_engine=diff_engine)
+
+
+## format file and calculate diff to its content, returns pair (output data, diff)
+## results are taken from cache if possible
+## if 'lazy_diff' is set and there is no cache, then diff is returned as generator
+## 'override_params' is dict of parameters overriding parameters of config
+def format_file(
+    input_file_path,
+    input_config_path,
+    cache: ResultCache = None,
+    diff_engine=None,
+    lazy_diff=False,
+    override_params=None,
+):
+    input_file = get_source_file(input_file_path)
+    input_data = input_file.data
+    language = get_file_language(input_file_path)
+    if cache is not None:
+        cached_result = cache.get(input_data, input_config_path, input_file.data_hash, override_params, language)
+        if cached_result is not None:
+            return cached_result
+
+    output_data = execute_uncrustify_pipe(input_file_path, input_config_path, input_data, override_params)
+    if cache is None and lazy_diff:
+        return output_data, iterate_content_diff(input_file, output_data, diff_engine)
+    raw_diff = calculate_content_diff(input_file, output_data, diff_engine)
+    if cache is not None:
+        cache.put(input_data, input_config_path, output_data, raw_diff, input_file.data_hash, override_params, language)
+    return output_data, raw_diff
+
+
+## format batch of files by single uncrustify execution (only files not found in cache)
+## returns dict mapping input file path to pair (output data, diff)
+def format_files_batch(
+    input_files_list,
+    input_config_path,
+    work_dir_path,
+    cache: ResultCache = None,
+    diff_engine=None,
+    override_params=None,
+):
+    ret_dict = {}
+    input_files_dict = {}
+    for input_file_path in input_files_list:
+        input_file = get_source_file(input_file_path)
+        if cache is not None:
+            language = get_file_language(input_file_path)
+            cached_result = cache.get(
+                input_file.data, input_config_path, input_file.data_hash, override_params, language
+            )
+            if cached_result is not None:
+                ret_dict[input_file_path] = cached_result
+                continue
+        input_files_dict[input_file_path] = input_file
+
+    if not input_files_dict:
+        return ret_dict
+
+    batch_dir_path = tempfile.mkdtemp(prefix="batch-", dir=work_dir_path)
+    try:
+        batch_output_dict = execute_uncrustify_batch(
+            list(input_files_dict.keys()), input_config_path, batch_dir_path, override_params
+        )
+        for input_file_path, input_file in input_files_dict.items():
+            with open(batch_output_dict[input_file_path], "rb") as output_file:
+                output_data = output_file.read()
+            raw_diff = calculate_content_diff(input_file, output_data, diff_engine)
+            if cache is not None:
+                cache.put(
+                    input_file.data,
+                    input_config_path,
+                    output_data,
+                    raw_diff,
+                    input_file.data_hash,
+                    override_params,
+                    get_file_language(input_file_path),
+                )
+            ret_dict[input_file_path] = (output_data, raw_diff)
+    finally:
+        shutil.rmtree(batch_dir_path, ignore_errors=True)
+    return ret_dict
+
+
+## unified diff of formatted content, comparing bytes first - most of outputs do not differ from input
+def calculate_content_diff(input_file: SourceFile, output_data, diff_engine=None):
+    return list(iterate_content_diff(input_file, output_data, diff_engine))
+
+
+def iterate_content_diff(input_file: SourceFile, output_data, diff_engine=None):
+    if output_data == input_file.data:
+        return iter(())
+    return iterate_unified_diff(input_file.lines, split_lines(output_data), diff_engine)
+
+
+## hash of config content together with content of included configs
+def calculate_config_hash(config_path):
+    config_stat = os.stat(config_path)
+    return _calculate_config_hash(os.path.abspath(config_path), config_stat.st_mtime_ns, config_stat.st_size)
+
+
+@functools.lru_cache(maxsize=1024)
+def _calculate_config_hash(config_path, _mtime, _size):
+    with open(config_path, "rb") as config_file:
+        config_data = config_file.read()
+    hash_obj = hashlib.sha256(config_data)
+    config_dir = os.path.dirname(config_path)
+    for line in config_data.decode(errors="replace").splitlines():
+        found = INCLUDE_REGEX.match(line)
+        if not found:
+            continue
+        include_path = os.path.join(config_dir, found.group(1))
+        if os.path.isfile(include_path):
+            hash_obj.update(calculate_config_hash(include_path).encode("utf-8"))
+    return hash_obj.hexdigest()
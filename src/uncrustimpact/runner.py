@@ -0,0 +1,242 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import logging
+import re
+import tempfile
+import shutil
+import functools
+
+import subprocess  # nosec
+
+from uncrustimpact.languages import get_file_language
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## sources are processed as bytes, decoding is done only when presenting content
+## content that is not valid UTF-8 is decoded with fallback encoding
+DEFAULT_FALLBACK_ENCODING = "latin-1"
+
+
+class UncrustifyError(RuntimeError):
+    def __init__(self, command, return_code, stderr_output=""):
+        super().__init__(f"unable to execute uncrustify (exit code: {return_code})")
+        self.command = command
+        self.return_code = return_code
+        self.stderr_output = stderr_output
+
+
+def execute_uncrustify(input_file_path, input_config_path, out_file_path):
+    ## spawns shell for each execution - execute_uncrustify_pipe is faster
+    language = get_file_language(input_file_path)
+    command = f"uncrustify -q -c {input_config_path} --no-backup -l {language} -f {input_file_path} -o {out_file_path}"
+    error_code = os.system(command)  # nosec
+    if error_code != 0:
+        _LOGGER.error("unable to execute command: %s", command)
+        raise UncrustifyError(command, error_code)
+
+
+## execute uncrustify directly (without shell), source is passed through stdin and
+## formatted content is received from stdout, so no temporary files are needed
+## returns formatted content as bytes
+## 'override_params' is dict of parameters overriding parameters of config
+## language is determined by extension of input file (content passed through stdin has no name)
+def execute_uncrustify_pipe(input_file_path, input_config_path, input_data=None, override_params=None):
+    language = get_file_language(input_file_path)
+    command = ["uncrustify", "-q", "-c", input_config_path, "-l", language]
+    command.extend(get_set_options(override_params))
+    if input_data is None:
+        with open(input_file_path, "rb") as input_file:
+            result = subprocess.run(command, stdin=input_file, capture_output=True, check=False)  # nosec
+    else:
+        result = subprocess.run(command, input=input_data, capture_output=True, check=False)  # nosec
+    if result.returncode != 0:
+        raise_execute_error(command, result, input_file_path)
+    return result.stdout
+
+
+## format many files by single uncrustify execution (config is parsed once)
+## uncrustify reads list of files (-F) and stores results under given directory (--prefix)
+## files of different languages are formatted by separate executions
+## returns dict mapping input file path to output file path
+def execute_uncrustify_batch(input_files_list, input_config_path, out_dir_path, override_params=None):
+    languages_dict = {}
+    for file_path in input_files_list:
+        languages_dict.setdefault(get_file_language(file_path), []).append(file_path)
+    ret_dict = {}
+    for language, files_list in languages_dict.items():
+        ret_dict.update(
+            execute_uncrustify_language_batch(files_list, input_config_path, out_dir_path, language, override_params)
+        )
+    return ret_dict
+
+
+def execute_uncrustify_language_batch(
+    input_files_list, input_config_path, out_dir_path, language, override_params=None
+):
+    if not input_files_list:
+        return {}
+    input_abs_list = [os.path.abspath(file_path) for file_path in input_files_list]
+    ## paths in list are relative to working directory - it prevents prefixing absolute paths
+    work_dir = os.path.dirname(os.path.commonprefix(input_abs_list))
+    if not work_dir:
+        work_dir = os.sep
+    out_dir_path = os.path.abspath(out_dir_path)
+
+    ret_dict = {}
+    rel_path_list = []
+    for file_path, abs_path in zip(input_files_list, input_abs_list):
+        rel_path = os.path.relpath(abs_path, work_dir)
+        out_file_path = os.path.join(out_dir_path, rel_path)
+        os.makedirs(os.path.dirname(out_file_path), exist_ok=True)
+        rel_path_list.append(rel_path)
+        ret_dict[file_path] = out_file_path
+
+    list_fd, list_path = tempfile.mkstemp(prefix="files-", suffix=".txt", dir=out_dir_path)
+    try:
+        with os.fdopen(list_fd, "w", encoding="utf-8") as list_file:
+            list_file.write("\n".join(rel_path_list))
+            list_file.write("\n")
+
+        command = [
+            "uncrustify",
+            "-q",
+            "-c",
+            os.path.abspath(input_config_path),
+            "-l",
+            language,
+            "-F",
+            list_path,
+            "--prefix",
+            out_dir_path,
+        ]
+        command.extend(get_set_options(override_params))
+        result = subprocess.run(command, cwd=work_dir, capture_output=True, check=False)  # nosec
+        if result.returncode != 0:
+            raise_execute_error(command, result)
+    finally:
+        os.remove(list_path)
+
+    return ret_dict
+
+
+## check if uncrustify handles 'include' option of config file
+def is_config_include_supported():
+    return is_feature_supported("include")
+
+
+## check if uncrustify handles '--set' option (overriding parameters of config)
+def is_set_option_supported():
+    return is_feature_supported("set")
+
+
+## uncrustify is executed with config prepared using given feature and resulting config is checked
+def is_feature_supported(feature_name):
+    binary_path = shutil.which("uncrustify")
+    if binary_path is None:
+        return False
+    binary_stat = os.stat(binary_path)
+    return _is_feature_supported(binary_path, binary_stat.st_mtime_ns, binary_stat.st_size, feature_name)
+
+
+@functools.lru_cache(maxsize=8)
+def _is_feature_supported(binary_path, _mtime, _size, feature_name):
+    with tempfile.TemporaryDirectory(prefix="uncrustimpact-") as temp_dir:
+        base_path = os.path.join(temp_dir, "base.cfg")
+        config_path = os.path.join(temp_dir, "config.cfg")
+        command = [binary_path, "-q", "-c", config_path, "--update-config"]
+        if feature_name == "include":
+            with open(base_path, "w", encoding="utf-8") as base_file:
+                base_file.write("indent_columns = 3\n")
+            with open(config_path, "w", encoding="utf-8") as config_file:
+                config_file.write(f'include "{base_path}"\nindent_with_tabs = 0\n')
+        elif feature_name == "set":
+            with open(config_path, "w", encoding="utf-8") as config_file:
+                config_file.write("indent_with_tabs = 0\n")
+            command.extend(get_set_options({"indent_columns": 3}))
+        else:
+            raise RuntimeError(f"unknown feature: {feature_name}")
+        result = subprocess.run(command, capture_output=True, check=False)  # nosec
+    if result.returncode != 0:
+        return False
+    output = result.stdout.decode(errors="replace")
+    return re.search(r"^\s*indent_columns\s*=\s*3\b", output, re.MULTILINE) is not None
+
+
+## identify uncrustify binary: its location, modification time and version
+def get_uncrustify_id():
+    binary_path = shutil.which("uncrustify")
+    if binary_path is None:
+        return "uncrustify"
+    binary_stat = os.stat(binary_path)
+    return _get_uncrustify_id(binary_path, binary_stat.st_mtime_ns, binary_stat.st_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_uncrustify_id(binary_path, mtime, size):
+    command = [binary_path, "--version"]
+    result = subprocess.run(command, capture_output=True, check=False)  # nosec
+    version = result.stdout.decode(errors="replace").strip()
+    return f"{binary_path}:{mtime}:{size}:{version}"
+
+
+## command line options overriding parameters of config
+def get_set_options(override_params):
+    ret_list = []
+    if not override_params:
+        return ret_list
+    for param_name, param_val in override_params.items():
+        ret_list.extend(["--set", f"{param_name}={param_val}"])
+    return ret_list
+
+
+def raise_execute_error(command, result, input_file_path=None):
+    command_str = " ".join(command)
+    stderr_output = result.stderr.decode(errors="replace")
+    if input_file_path:
+        command_str += f" < {input_file_path}"
+    _LOGGER.error(
+        "unable to execute command: %s\nexit code: %s\n=== std err: ===\n%s",
+        command_str,
+        result.returncode,
+        stderr_output,
+    )
+    raise UncrustifyError(command_str, result.returncode, stderr_output)
+
+
+## split content to lines of bytes, line endings are translated as by 'readlines()' of file opened in text mode
+def split_lines(content_data):
+    if b"\r" in content_data:
+        content_data = content_data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return content_data.splitlines(keepends=True)
+
+
+## read file as list of lines of bytes
+def read_lines(file_path):
+    with open(file_path, "rb") as content_file:
+        return split_lines(content_file.read())
+
+
+## decode bytes or buffer (e.g. 'memoryview') without copying it
+def decode_content(content_data, fallback_encoding=None):
+    try:
+        return str(content_data, "utf-8")
+    except UnicodeDecodeError:
+        if not fallback_encoding:
+            fallback_encoding = DEFAULT_FALLBACK_ENCODING
+        return str(content_data, fallback_encoding, errors="replace")
+
+
+def write_data(file_path, content_data):
+    with open(file_path, "wb") as out_file:
+        out_file.write(content_data)
@@ -0,0 +1,80 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import logging
+import queue
+
+from multiprocessing import Pool
+
+# from uncrustimpact.multiprocessingmock import DummyPool as Pool
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def get_jobs_num(jobs=None):
+    if jobs is None or jobs < 1:
+        cpu_num = os.cpu_count()
+        if cpu_num is None:
+            return 1
+        return cpu_num
+    return jobs
+
+
+## single pool of workers executing all tasks with bounded concurrency
+## results are received in order of completion together with key given on submit
+class TaskScheduler:
+    def __init__(self, jobs=None, initializer=None, initargs=()):
+        self.jobs = get_jobs_num(jobs)
+        self._initializer = initializer
+        self._initargs = initargs
+        self._pool = None
+        self._results: queue.Queue = queue.Queue()
+        self._pending = 0
+
+    def __enter__(self):
+        self._pool = Pool(self.jobs, initializer=self._initializer, initargs=self._initargs)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._pool.__exit__(exc_type, exc_value, traceback)
+        self._pool = None
+
+    ## number of tasks that keeps all workers busy
+    def window_size(self):
+        return self.jobs * 2
+
+    def pending(self):
+        return self._pending
+
+    def is_full(self):
+        return self._pending >= self.window_size()
+
+    def submit(self, key, func, args=()):
+        self._pending += 1
+
+        def on_success(result):
+            self._results.put((key, True, result))
+
+        def on_error(error):
+            self._results.put((key, False, error))
+
+        self._pool.apply_async(func, args, callback=on_success, error_callback=on_error)
+
+    ## wait for next finished task, returns pair (key, result)
+    def get_result(self):
+        if self._pending < 1:
+            raise RuntimeError("no pending tasks")
+        key, success, value = self._results.get()
+        self._pending -= 1
+        if not success:
+            raise value
+        return key, value
@@ -0,0 +1,233 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import logging
+import random
+from collections import deque
+
+from uncrustimpact.runner import execute_uncrustify_pipe, UncrustifyError
+from uncrustimpact.sourcefile import get_source_file
+from uncrustimpact.scheduler import TaskScheduler
+from uncrustimpact.cfgparser import read_cfg_to_dict, is_cfg_valid
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_LOGGER = logging.getLogger(__name__)
+
+
+## screen variants of parameters ('run_configs_list' is list of run configs of variants - pairs
+## (config path, dict of overriding parameters)), screening requires variants defined by base config
+## and overriding parameters (see 'lazy_configs' of 'generate_config_files')
+## returns set of indexes of variants that can have impact or None if variants can not be screened
+## 'variants_indexes' limits screened variants, other variants are not included in result
+def screen_params_variants(
+    scheduler: TaskScheduler, run_configs_list, files_list, group_size, params_space_dict, variants_indexes=None
+):
+    if group_size is None or group_size < 2:
+        return None
+    if variants_indexes is None:
+        variants_indexes = range(0, len(run_configs_list))
+    if not run_configs_list:
+        return set()
+    base_cfg_path = run_configs_list[0][0]
+    for cfg_path, override_params in run_configs_list:
+        if cfg_path != base_cfg_path or not override_params:
+            _LOGGER.info("group screening requires uncrustify supporting '--set' option - screening skipped")
+            return None
+
+    base_values = read_cfg_to_dict(base_cfg_path, params_space_dict)
+
+    def is_valid_group(override_params):
+        return is_cfg_valid({**base_values, **override_params})
+
+    variants_list = [(index, run_configs_list[index][1]) for index in variants_indexes]
+    return screen_variants(scheduler, variants_list, files_list, base_cfg_path, group_size, is_valid_group)
+
+
+## group testing of variants
+## changes of many parameters are applied by single uncrustify execution - if output of every file
+## is equal to its reference, then none of variants of the group has impact
+## groups changing output are split into halves until single variants remain
+## single variants are not tested here - they are confirmed by regular calculation
+##
+## 'variants_list' is list of pairs (variant index, dict of overriding parameters)
+## 'files_list' is list of pairs (input file path, reference file path)
+## 'is_valid_group' is optional function checking if parameters of group can be combined
+## returns set of indexes of variants that can have impact
+def screen_variants(
+    scheduler: TaskScheduler, variants_list, files_list, base_cfg_path, group_size, is_valid_group=None
+):
+    groups_queue = deque(split_to_groups(variants_list, group_size, is_valid_group))
+    groups_num = len(groups_queue)
+    survivors = set()
+    executions_counter = 0
+    while True:
+        while groups_queue and not scheduler.is_full():
+            group = groups_queue.popleft()
+            if len(group) < 2:
+                survivors.update(item[0] for item in group)
+                continue
+            override_params = merge_override_params(group)
+            args = [files_list, base_cfg_path, override_params]
+            scheduler.submit(tuple(group), check_group_impact, args)
+
+        if scheduler.pending() < 1:
+            break
+
+        group, (changed, executions) = scheduler.get_result()
+        executions_counter += executions
+        if not changed:
+            continue
+        half_size = len(group) // 2
+        groups_queue.append(list(group[:half_size]))
+        groups_queue.append(list(group[half_size:]))
+
+    variants_num = len(variants_list)
+    _LOGGER.info(
+        "group screening: %s of %s variants can have impact (groups: %s, uncrustify executions: %s instead of %s)",
+        len(survivors),
+        variants_num,
+        groups_num,
+        executions_counter,
+        variants_num * len(files_list),
+    )
+    return survivors
+
+
+## split variants into groups of given size, every parameter occurs in group at most once
+def split_to_groups(variants_list, group_size, is_valid_group=None):
+    groups_list = []
+    groups_params = []
+    for variant_item in variants_list:
+        variant_params = variant_item[1]
+        for group, group_params in zip(groups_list, groups_params):
+            if len(group) >= group_size:
+                continue
+            if not group_params.isdisjoint(variant_params):
+                continue
+            if is_valid_group is not None and not is_valid_group(merge_override_params(group + [variant_item])):
+                continue
+            group.append(variant_item)
+            group_params.update(variant_params)
+            break
+        else:
+            groups_list.append([variant_item])
+            groups_params.append(set(variant_params))
+    return groups_list
+
+
+def merge_override_params(group):
+    ret_dict = {}
+    for _, override_params in group:
+        ret_dict.update(override_params)
+    return ret_dict
+
+
+## check if config with overriding parameters changes any of files, returns pair (changed, executions number)
+## checking stops on first changed file
+def check_group_impact(files_list, base_cfg_path, override_params):
+    executions = 0
+    for input_file_path, reference_file_path in files_list:
+        input_data = get_source_file(input_file_path).data
+        executions += 1
+        try:
+            output_data = execute_uncrustify_pipe(input_file_path, base_cfg_path, input_data, override_params)
+        except UncrustifyError:
+            ## parameters of group can not be combined - group is split
+            return True, executions
+        if output_data != get_source_file(reference_file_path).data:
+            return True, executions
+    return False, executions
+
+
+## screening of variants on sample of files (see 'select_sample')
+## 'variants_list' is list of tuples (variant index, run config, list of pairs (input file path, reference file path))
+## run config is pair (config path, dict of overriding parameters)
+## variant that does not change any of its files is pruned, so unlike group screening the result is estimation:
+## pruned variant can still change files outside of sample
+## 'total_files' is number of all files (used in report)
+## returns set of indexes of variants that changed any file of sample
+def screen_variants_sample(scheduler: TaskScheduler, variants_list, total_files):
+    survivors = set()
+    executions_counter = 0
+    variants_queue = deque(variants_list)
+    while True:
+        while variants_queue and not scheduler.is_full():
+            variant_index, run_config, files_list = variants_queue.popleft()
+            args = [files_list, run_config[0], run_config[1]]
+            scheduler.submit(variant_index, check_group_impact, args)
+
+        if scheduler.pending() < 1:
+            break
+
+        variant_index, (changed, executions) = scheduler.get_result()
+        executions_counter += executions
+        if changed:
+            survivors.add(variant_index)
+
+    pruned_num = len(variants_list) - len(survivors)
+    sample_size = max((len(item[2]) for item in variants_list), default=0)
+    _LOGGER.info(
+        "sample screening: %s of %s variants pruned (no changes on sample of %s files),"
+        " saved about %s of %s uncrustify executions (screening executions: %s)",
+        pruned_num,
+        len(variants_list),
+        sample_size,
+        pruned_num * max(total_files - sample_size, 0),
+        len(variants_list) * total_files,
+        executions_counter,
+    )
+    if pruned_num > 0 and sample_size > 0:
+        _LOGGER.info(
+            "sample screening: with 95%% confidence each pruned variant changes less than %.2f%% of files",
+            calculate_prune_bound(sample_size) * 100,
+        )
+    return survivors
+
+
+## upper bound of fraction of files changed by variant that did not change any of 'sample_size' files
+## (probability of not changing any file of sample is below 1 - 'confidence' for greater fractions)
+def calculate_prune_bound(sample_size, confidence=0.95):
+    if sample_size < 1:
+        return 1.0
+    return 1.0 - (1.0 - confidence) ** (1.0 / sample_size)
+
+
+## select stratified sample of files - files are grouped by directory, number of selected files of each
+## directory is proportional to size of group, files of group are selected evenly in order of files sizes
+## returns sorted list of indexes of selected files
+def select_sample(files_paths, sample_size, seed=None):
+    total_files = len(files_paths)
+    if sample_size is None or sample_size < 1 or sample_size >= total_files:
+        return list(range(0, total_files))
+    rand = random.Random(seed)
+
+    strata = {}
+    for file_index, file_path in enumerate(files_paths):
+        strata.setdefault(os.path.dirname(file_path), []).append(file_index)
+
+    ## proportional allocation, remaining items are given to groups with largest remainders
+    quotas = {key: len(indexes) * sample_size / total_files for key, indexes in strata.items()}
+    allocation = {key: int(quota) for key, quota in quotas.items()}
+    remaining = sample_size - sum(allocation.values())
+    strata_order = sorted(strata.keys(), key=lambda key: (allocation[key] - quotas[key], rand.random()))
+    for key in strata_order[:remaining]:
+        allocation[key] += 1
+
+    selected = []
+    for key, indexes in strata.items():
+        count = allocation[key]
+        if count < 1:
+            continue
+        indexes = sorted(indexes, key=lambda index: (os.path.getsize(files_paths[index]), files_paths[index]))
+        step = len(indexes) / count
+        offset = rand.random() * step
+        selected.extend(indexes[int(offset + item * step)] for item in range(0, count))
+    return sorted(selected)
@@ -0,0 +1,116 @@
+#
+# Copyright (c) 2024, Arkadiusz Netczuk <dev.arnet@gmail.com>
+# All rights reserved.
+#
+# This source code is licensed under the BSD 3-Clause license found in the
+# LICENSE file in the root directory of this source tree.
+#
+
+import os
+import mmap
+import functools
+from array import array
+from typing import List
+
+from uncrustimpact.diffengine import InternedLines
+from uncrustimpact.fileutils import calculate_hash
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+## read-only source file mapped to memory with index of lines offsets
+## lines are given as views of mapped content (without copying), list of lines is created only if needed
+## line endings are translated as by 'readlines()' of file opened in text mode
+## raw content (passed to uncrustify), its hash and interned lines are kept for formatting with many configs
+class SourceFile:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, "rb") as source_file:
+            file_size = os.fstat(source_file.fileno()).st_size
+            if file_size > 0:
+                raw_data = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                ## empty file can not be mapped
+                raw_data = b""
+        content_data = raw_data
+        if raw_data.find(b"\r") >= 0:
+            ## translation of line endings requires copy of content
+            content_data = raw_data[:].replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        self._raw_data = raw_data
+        self._raw_view = memoryview(raw_data)
+        self._data = content_data
+        self._view = memoryview(content_data)
+        self.line_offsets = calculate_line_offsets(content_data)
+        self._lines: InternedLines = None
+        self._data_hash: str = None
+
+    def __len__(self):
+        return len(self.line_offsets) - 1
+
+    def close(self):
+        self._view.release()
+        self._raw_view.release()
+        if isinstance(self._raw_data, mmap.mmap):
+            self._raw_data.close()
+
+    ## raw content of file (line endings not translated)
+    @property
+    def data(self) -> memoryview:
+        return self._raw_view
+
+    ## hash of raw content, calculated on first access
+    @property
+    def data_hash(self) -> str:
+        if self._data_hash is None:
+            self._data_hash = calculate_hash(self._raw_view)
+        return self._data_hash
+
+    ## whole content (translated line endings)
+    @property
+    def content(self) -> memoryview:
+        return self._view
+
+    ## list of lines of bytes, created on first access
+    ## lines are interned, so ids of lines are calculated once for all diffs against the file
+    @property
+    def lines(self) -> InternedLines:
+        if self._lines is None:
+            self._lines = InternedLines(split_by_offsets(self._data, self.line_offsets))
+        return self._lines
+
+    def get_line_view(self, line_index) -> memoryview:
+        return self._view[self.line_offsets[line_index] : self.line_offsets[line_index + 1]]
+
+    def get_line_hash(self, line_index) -> int:
+        return hash(self.get_line_view(line_index))
+
+
+## get source file shared by calls in current process, file is mapped again if it was modified
+## tools format the same input with each variant of config, so the input is read, hashed and split only once
+def get_source_file(file_path) -> SourceFile:
+    file_stat = os.stat(file_path)
+    return _get_source_file(file_path, file_stat.st_mtime_ns, file_stat.st_size)
+
+
+@functools.lru_cache(maxsize=32)
+def _get_source_file(file_path, _mtime, _size):
+    return SourceFile(file_path)
+
+
+## offsets of beginnings of lines followed by length of content
+def calculate_line_offsets(content_data):
+    offsets = array("q", [0])
+    content_size = len(content_data)
+    position = content_data.find(b"\n")
+    while position >= 0:
+        offsets.append(position + 1)
+        position = content_data.find(b"\n", position + 1)
+    if offsets[-1] != content_size:
+        ## last line without new line character
+        offsets.append(content_size)
+    return offsets
+
+
+def split_by_offsets(content_data, offsets):
+    return [content_data[offsets[index] : offsets[index + 1]] for index in range(0, len(offsets) - 1)]